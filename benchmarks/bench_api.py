@@ -0,0 +1,130 @@
+"""Load-test the ingestion API with many small concurrent updates.
+
+    python benchmarks/bench_api.py [--connections 50] [--requests 200] [--backend json|sqlite] [--json results.json]
+
+Starts `python -m fittracker.api` in a scratch directory with one account,
+then opens --connections keep-alive connections that each send --requests
+small updates (steps added to, or foods logged on, one of the last 30 or
+more days) back to back. Bigger runs spread over more days, so no day's
+totals reach the API's daily limits. Reports updates per second, latency percentiles and
+how many group commits the server needed, then checks the stored step
+totals add up to what was sent.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fittracker import FOOD_DATA
+from fittracker.accounts import AccountStore
+
+USERNAME, PASSWORD = "loadtest", "loadtest-password"
+
+
+async def request(reader, writer, method, path, auth, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: {auth}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port, auth, requests, days, seed, latencies, sent_steps):
+    rng = random.Random(seed)
+    foods = list(FOOD_DATA)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for _ in range(requests):
+        day = rng.choice(days)
+        if rng.random() < 0.5:
+            steps = rng.randint(10, 500)
+            path, payload = f"/v1/entries/{day}/steps", {"steps": steps, "mode": "add"}
+        else:
+            steps = 0
+            path, payload = f"/v1/entries/{day}/foods", {"foods": {rng.choice(foods): rng.randint(1, 50)}, "mode": "add"}
+        start = time.perf_counter()
+        status, body = await request(reader, writer, "POST", path, auth, payload)
+        latencies.append(time.perf_counter() - start)
+        assert status == 200, body
+        sent_steps[day] = sent_steps.get(day, 0) + steps
+    writer.close()
+
+
+async def load_test(port, connections, requests):
+    auth = "Basic " + base64.b64encode(f"{USERNAME}:{PASSWORD}".encode()).decode()
+    # About 150 step updates (~38k steps) a day on average, well inside MAX_DAILY_STEPS
+    days = [(date(2025, 1, 1) - timedelta(days=i)).isoformat() for i in range(max(30, connections * requests // 300))]
+    # One request first so the password check isn't part of the timed run
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await request(reader, writer, "GET", "/v1/health", auth)
+    status, _ = await request(reader, writer, "POST", f"/v1/entries/{days[0]}/steps", auth, {"steps": 0, "mode": "add"})
+    assert status == 200
+    latencies, sent_steps = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, auth, requests, days, i, latencies, sent_steps) for i in range(connections)))
+    seconds = time.perf_counter() - start
+    _, health = await request(reader, writer, "GET", "/v1/health", auth)
+    stored = {d: (await request(reader, writer, "GET", f"/v1/entries/{d}", auth))[1].get("steps", 0) for d in sent_steps}
+    writer.close()
+    assert stored == sent_steps, "stored step totals don't match what was sent"
+    latencies.sort()
+    return {
+        "updates": len(latencies), "seconds": seconds, "updates_per_sec": len(latencies) / seconds,
+        "p50_ms": statistics.median(latencies) * 1000, "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "group_commits": health["batches"] - 1,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200, help="updates per connection")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        AccountStore(os.path.join(workdir, "fitness_users.json")).create(USERNAME, PASSWORD)
+        env = {**os.environ, "PYTHONPATH": REPO_ROOT, "FITTRACKER_STORAGE": args.backend}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "fittracker.api", "--port", str(args.port)],
+            cwd=workdir, env=env, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            server.stdout.readline()  # "Listening on ..."
+            result = asyncio.run(load_test(args.port, args.connections, args.requests))
+        finally:
+            server.terminate()
+            server.wait()
+
+    result["backend"] = args.backend
+    print(f"{result['updates']:,} updates over {args.connections} connections ({args.backend}): "
+          f"{result['updates_per_sec']:,.0f} updates/s, p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+          f"{result['group_commits']:,} group commits")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Cold-start time from a fresh Python process to the rendered login screen.
+
+    python benchmarks/bench_coldstart.py [--runs 5] [--budget-ms 1500] [--json results.json]
+
+Each run spawns a new interpreter that imports Streamlit's test harness and
+runs code1.py once, unauthenticated, so nothing is warm in sys.modules or
+any cache. It reports the wall time of the whole process, the script run
+alone (our imports plus the login page), and which heavy modules the script
+run loaded beyond what Streamlit itself imports. --budget-ms exits non-zero when the median script run exceeds it,
+so the figure can be tracked in CI alongside bench_hotpaths.py.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the login screen should never need
+HEAVY_MODULES = ("pandas", "numpy", "plotly.graph_objs", "fpdf", "pyarrow", "openpyxl")
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+preloaded = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+t2 = time.perf_counter()
+assert not at.exception, at.exception
+heavy = [m for m in json.loads(sys.argv[2]) if m in sys.modules and m not in preloaded]
+print(json.dumps({"harness_ms": (t1 - t0) * 1000, "script_ms": (t2 - t1) * 1000, "heavy_modules": heavy}))
+"""
+
+
+def cold_start(workdir):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD, os.path.join(REPO_ROOT, "code1.py"), json.dumps(HEAVY_MODULES)],
+        cwd=workdir, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="fail if the median script run is slower than this")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    # A scratch cwd keeps the run from touching (or being sped up by) real diary files
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [cold_start(workdir) for _ in range(args.runs)]
+
+    summary = {
+        key: statistics.median(r[key] for r in runs) for key in ("process_ms", "harness_ms", "script_ms")
+    }
+    summary["heavy_modules"] = sorted({m for r in runs for m in r["heavy_modules"]})
+    print(f"{'':<22} {'median ms':>10} {'min ms':>10}")
+    for key in ("process_ms", "harness_ms", "script_ms"):
+        print(f"{key:<22} {summary[key]:>10.1f} {min(r[key] for r in runs):>10.1f}")
+    print("heavy modules loaded:", ", ".join(summary["heavy_modules"]) or "none")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "runs": runs}, f, indent=2)
+    if args.budget_ms is not None and summary["script_ms"] > args.budget_ms:
+        sys.exit(f"cold start {summary['script_ms']:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Time the fittracker hot paths on synthetic multi-year diaries.
+
+    python benchmarks/bench_hotpaths.py [--years 1 5 20] [--repeat 5] [--json results.json]
+
+Each case reports the best wall time over --repeat runs, throughput in items
+(days, saves, points) per second, and peak Python memory from one extra
+traced run. Save the JSON output to compare runs for regressions. Food
+catalog and bulk import cases don't depend on diary size and are reported
+with years 0.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fittracker import FOOD_DATA, calculate_macros, load_records, storage
+from fittracker.catalog import FoodCatalog, build_columns, map_catalog_bin, write_catalog_bin
+from fittracker.importer import import_exports
+from fittracker.charts import PLOT_POINT_BUDGET, PROGRESS_METRICS, plot_enhanced_trends
+from fittracker.nutrient_matrix import calculate_macros_batch, food_quantity_matrix
+from fittracker.trends import analyze_trends
+from synthetic import generate_catalog, generate_diary, write_food_export, write_steps_export
+
+
+def measure(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def bench_size(years, repeat, workdir):
+    os.chdir(workdir)
+    diary = generate_diary(years)
+    days = len(diary)
+    with open(storage.DATA_FILE, "w") as f:
+        json.dump(diary, f, indent=2)
+    storage.JOURNAL_COMPACT_BYTES = float("inf")  # keep background compaction out of the timings
+    storage.get_shared_diary().invalidate()
+    sqlite_store = storage.migrate_json_to_sqlite(db_file=os.path.join(workdir, "bench.db"))
+
+    records, _ = load_records(diary)
+    food_dicts = [e["food"] for e in diary.values()]
+    end = max(diary)
+    start_90 = (date.fromisoformat(end) - timedelta(days=90)).isoformat()
+    index = storage.DateIndex(diary)
+    save_dates = [(date.fromisoformat(end) + timedelta(days=i + 1)).isoformat() for i in range(200)]
+    sample_entry = diary[end]
+
+    def save_entries():
+        for d in save_dates:
+            storage.save_entry(d, sample_entry)
+
+    def macros_batch():
+        calculate_macros_batch(food_quantity_matrix(food_dicts))
+
+    metrics = PROGRESS_METRICS
+    cases = [
+        ("load_data (json)", storage.load_data, days),
+        ("load_data (sqlite)", sqlite_store.load_all, days),
+        ("load_records (json -> DayEntry)", lambda: load_records(storage.load_data()), days),
+        ("save_entry x200 (journal)", save_entries, len(save_dates)),
+        ("replace_all (full rewrite)", lambda: storage.get_store().replace_all(diary), days),
+        ("calculate_macros (per day)", lambda: [calculate_macros(f) for f in food_dicts], days),
+        ("calculate_macros_batch", macros_batch, days),
+        ("progress filter 90d (scan)", lambda: {k: v for k, v in diary.items() if start_90 <= k <= end}, days),
+        ("progress filter 90d (bisect)", lambda: index.range(start_90, end), days),
+        ("analyze_trends (all, DayEntry)", lambda: analyze_trends(records, index.dates), days),
+        ("plot_enhanced_trends 365d", lambda: plot_enhanced_trends(
+            diary, "weight", *metrics["weight"], dates=index.range(str(int(end[:4]) - 1) + end[4:], end),
+            max_points=PLOT_POINT_BUDGET), min(days, 365)),
+        ("plot_enhanced_trends all (LTTB)", lambda: plot_enhanced_trends(
+            diary, "weight", *metrics["weight"], dates=index.dates, max_points=PLOT_POINT_BUDGET), days),
+    ]
+    # Warm the shared diary so save_entry measures appends, not the first load
+    storage.get_shared_diary().snapshot()
+    results = []
+    for name, fn, items in cases:
+        seconds, peak = measure(fn, repeat)
+        results.append({
+            "years": years, "case": name, "items": items, "seconds": seconds,
+            "items_per_sec": items / seconds if seconds else float("inf"), "peak_mb": peak / 2**20,
+        })
+    sqlite_store.conn.close()
+    return results
+
+
+def bench_catalog(size, repeat, workdir):
+    foods = list(FOOD_DATA.items()) + list(generate_catalog(size))
+    bin_path = os.path.join(workdir, "food_catalog.bin")
+    write_catalog_bin(build_columns(foods), bin_path)
+    catalog = FoodCatalog(map_catalog_bin(bin_path))
+    queries = ["ch", "chick", "chicken gri", "chiken", "brocoli stemed", "whey"]
+    names = [catalog.names[i] for i in range(0, len(catalog), max(1, len(catalog) // 1000))]
+    cases = [
+        (f"catalog compile ({size:,} foods)", lambda: build_columns(foods), size),
+        ("catalog open (mmap)", lambda: FoodCatalog(map_catalog_bin(bin_path)), size),
+        ("catalog get x1000", lambda: [catalog.get(name) for name in names], len(names)),
+        ("catalog search x6 (prefix+fuzzy)", lambda: [catalog.search(q) for q in queries], len(queries)),
+    ]
+    results = []
+    for name, fn, items in cases:
+        seconds, peak = measure(fn, 1 if "compile" in name else repeat)
+        results.append({
+            "years": 0, "case": name, "items": items, "seconds": seconds,
+            "items_per_sec": items / seconds if seconds else float("inf"), "peak_mb": peak / 2**20,
+        })
+    return results
+
+
+def bench_import(days, root):
+    """Import a minute-level steps export and a food log into an empty diary.
+
+    The timed run and the traced run each import into their own fresh
+    directory, so tracing doesn't slow the reported rows/sec.
+    """
+    steps_path, food_path = os.path.join(root, "steps.csv"), os.path.join(root, "food.csv")
+    rows = write_steps_export(steps_path, days) + write_food_export(food_path, days)
+    reports = []
+    for name in ("import", "import_traced"):
+        os.mkdir(os.path.join(root, name))
+        os.chdir(os.path.join(root, name))
+        storage.get_shared_diary().invalidate()
+        if name == "import_traced":
+            tracemalloc.start()
+        reports.append(import_exports(steps=steps_path, food=food_path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report = reports[0]
+    assert report.rows == rows and report.days == days, report.summary()
+    return [{
+        "years": 0, "case": f"import_exports ({days} days)", "items": rows, "seconds": report.seconds,
+        "items_per_sec": report.rows_per_sec, "peak_mb": peak / 2**20,
+    }]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--catalog-size", type=int, default=300_000, help="foods in the synthetic catalog (0 skips it)")
+    parser.add_argument("--import-days", type=int, default=365, help="days of minute-level steps to bulk import (0 skips it)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        results = []
+        for years in args.years:
+            workdir = os.path.join(root, f"{years}y")
+            os.mkdir(workdir)
+            results += bench_size(years, args.repeat, workdir)
+        if args.catalog_size:
+            results += bench_catalog(args.catalog_size, args.repeat, root)
+        if args.import_days:
+            results += bench_import(args.import_days, root)
+        os.chdir(REPO_ROOT)
+
+    print(f"{'years':>5}  {'case':<34} {'ms':>10} {'items/s':>12} {'peak MB':>9}")
+    for r in results:
+        print(f"{r['years']:>5}  {r['case']:<34} {r['seconds'] * 1000:>10.2f} {r['items_per_sec']:>12,.0f} {r['peak_mb']:>9.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Seeded synthetic diaries shaped like the entries the app saves."""
+
+import csv
+import random
+from datetime import date, datetime, timedelta
+
+from fittracker import FOOD_DATA, WORKOUT_CALORIES, compute_entry_totals
+
+WORKOUTS = ["Chest", "Back", "Bicep", "Tricep", "Shoulder", "Legs", "Cardio", "Full Body"]
+SNACKS = ["Protein bar", "Banana", "Coffee", "Apple", "Chocolate", "Sandwich"]
+NOTES = ["", "", "shoulder workout", "leg day, felt strong", "light cardio", "rest and stretch"]
+
+
+def generate_diary(years, seed=0, end=date(2025, 1, 1)):
+    """A diary of `years` x 365 consecutive days ending at `end`.
+
+    Derived totals come from compute_entry_totals, like a real save, so they
+    match what the app would have stored.
+    """
+    rng = random.Random(seed)
+    days = years * 365
+    weight = rng.uniform(70, 95)
+    diary = {}
+    for offset in range(days):
+        date_str = (end - timedelta(days=days - 1 - offset)).isoformat()
+        weight = min(max(weight + rng.gauss(-0.01, 0.25), 50.0), 130.0)
+        is_gym_day = rng.random() < 0.55
+
+        food = {}
+        for name, info in FOOD_DATA.items():
+            if rng.random() < 0.75:
+                base = info["base"]
+                food[name] = float(round(base * rng.uniform(0.5, 1.5))) if info["unit"] == "g" else float(rng.randint(0, 3))
+            else:
+                food[name] = 0.0
+        additional_meals = [
+            {"name": rng.choice(SNACKS), "calories": float(rng.randint(50, 400))}
+            for _ in range(rng.choice([0, 0, 0, 1, 1, 2]))
+        ]
+        exercises = []
+        if is_gym_day:
+            for _ in range(rng.randint(1, 3)):
+                intensity = rng.randint(1, 3)
+                exercises.append({"type": rng.choice(WORKOUTS), "intensity": intensity, "calories": WORKOUT_CALORIES[intensity]})
+        direct_calories = rng.choice([0, 0, 0, 50, 100, 150])
+        steps = max(0, int(rng.gauss(9000, 3500)))
+
+        entry = {
+            "date": date_str,
+            "weight": round(weight, 1),
+            "height": 181.0,
+            "age": 24,
+            "steps": steps,
+            "workout_notes": rng.choice(NOTES),
+            "food": food,
+            "additional_meals": additional_meals,
+            "exercises": exercises,
+            "is_gym_day": is_gym_day,
+            "direct_calories": direct_calories,
+        }
+        entry.update(compute_entry_totals(entry))
+        diary[date_str] = entry
+    return diary
+
+
+FOOD_WORDS = [
+    "chicken", "beef", "pork", "turkey", "salmon", "tuna", "egg", "tofu", "lentil", "bean", "rice", "oat",
+    "wheat", "corn", "potato", "tomato", "onion", "spinach", "broccoli", "carrot", "apple", "banana", "berry",
+    "mango", "yogurt", "cheese", "milk", "butter", "almond", "peanut", "cashew", "walnut", "bread", "pasta",
+    "noodle", "soup", "salad", "curry", "stew", "sauce",
+]
+FOOD_STYLES = ["raw", "boiled", "grilled", "fried", "baked", "roasted", "steamed", "canned", "frozen", "dried", "smoked", "low fat"]
+
+
+def generate_catalog(size, seed=0):
+    """`size` (name, info) pairs shaped like rows of a food catalog file."""
+    rng = random.Random(seed)
+    for i in range(size):
+        words = rng.sample(FOOD_WORDS, rng.randint(1, 3))
+        name = f"{' '.join(words).title()}, {rng.choice(FOOD_STYLES)} #{i}"
+        unit = "count" if rng.random() < 0.1 else "g"
+        yield name, {
+            "unit": unit,
+            "base": 1.0 if unit == "count" else 100.0,
+            "cal": round(rng.uniform(20, 600), 1),
+            "protein": round(rng.uniform(0, 40), 1),
+            "fat": round(rng.uniform(0, 50), 1),
+        }
+
+
+def write_steps_export(path, days, seed=0, end=date(2025, 1, 1)):
+    """A minute-level pedometer export (timestamp,steps) for `days` days ending at `end`; returns its row count."""
+    rng = random.Random(seed)
+    start = datetime.combine(end - timedelta(days=days - 1), datetime.min.time())
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "steps"])
+        for minute in range(days * 24 * 60):
+            awake = 7 * 60 <= minute % (24 * 60) < 23 * 60
+            steps = rng.randint(0, 40) if awake and rng.random() < 0.4 else 0
+            writer.writerow([(start + timedelta(minutes=minute)).isoformat(), steps])
+            rows += 1
+    return rows
+
+
+def write_food_export(path, days, seed=0, end=date(2025, 1, 1)):
+    """A food-log export (date,food,quantity) naming FOOD_DATA foods the way a tracker app might; returns its row count."""
+    rng = random.Random(seed)
+    names = list(FOOD_DATA)
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "food", "quantity"])
+        for offset in range(days):
+            date_str = (end - timedelta(days=days - 1 - offset)).isoformat()
+            for _ in range(rng.randint(8, 20)):
+                name = rng.choice(names)
+                info = FOOD_DATA[name]
+                quantity = round(info["base"] * rng.uniform(0.3, 1.0)) if info["unit"] == "g" else 1
+                writer.writerow([date_str, rng.choice([name, name.lower(), name.upper()]), quantity])
+                rows += 1
+            if rng.random() < 0.1:
+                writer.writerow([date_str, rng.choice(SNACKS) + " (restaurant)", 1])
+                rows += 1
+    return rows
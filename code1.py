@@ -1,17 +1,18 @@
 import streamlit as st
-import pandas as pd
-import json
-import os
 from datetime import datetime, timedelta
-import plotly.graph_objs as go
-import plotly.express as px
-from fpdf import FPDF
-import base64
 
-# ----------- Enhanced Constants & Configuration ------------
+from fittracker import (
+    FOOD_DATA, DayEntry, get_daily_goals, calculate_macros, calculate_bmi, get_bmi_category,
+    steps_to_miles_calories, compute_entry_totals, get_shared_diary, save_entry, rollup_mean, PROFILER,
+    get_accounts, ConflictError, entry_version, WORKOUT_CALORIES,
+    MAX_DAILY_STEPS, MAX_FOOD_QUANTITY, goals_met as entry_goals_met,
+)
+from fittracker.charts import PLOT_POINT_BUDGET, PROGRESS_METRICS, plot_enhanced_trends, plot_progress_overview, plot_weight_trend
+from fittracker.exporters import EXPORT_TABLES, export_to_tempfile, write_all_csv_zip, write_csv, write_excel, write_parquet
+from fittracker.jobs import get_report_runner
+from fittracker.pdf_report import build_pdf_report
 
-PASSCODE = "1512"
-DATA_FILE = "fitness_diary_data.json"
+# ----------- Enhanced Constants & Configuration ------------
 
 # Enhanced theme configuration
 st.set_page_config(
@@ -106,118 +107,10 @@ def load_custom_css():
     </style>
     """, unsafe_allow_html=True)
 
-# Enhanced Food Database organized by meals with correct values
-FOOD_DATA = {
-    # Meal 1 Foods
-    "Oats": {"unit": "g", "base": 45, "cal": 170, "protein": 10, "fat": 0, "meal": "Meal 1"},
-    "Whey Protein": {"unit": "g", "base": 33, "cal": 120, "protein": 25, "fat": 0, "meal": "Meal 1"},
-    "Skim Milk Powder": {"unit": "g", "base": 46, "cal": 160, "protein": 16, "fat": 0, "meal": "Meal 1"},
-    "PB Powder": {"unit": "g", "base": 16, "cal": 80, "protein": 7, "fat": 0, "meal": "Meal 1"},
-    "Nuts": {"unit": "g", "base": 15, "cal": 100, "protein": 2, "fat": 9, "meal": "Meal 1"},
-    
-    # Meal 2 Foods
-    "White Rice": {"unit": "g", "base": 150, "cal": 210, "protein": 5, "fat": 0.5, "meal": "Meal 2"},
-    "Tomato": {"unit": "count", "base": 1, "cal": 25, "protein": 0.5, "fat": 0, "meal": "Meal 2"},
-    "Onion": {"unit": "count", "base": 1, "cal": 25, "protein": 0.5, "fat": 0, "meal": "Meal 2"},
-    "Yogurt": {"unit": "g", "base": 170, "cal": 90, "protein": 18, "fat": 0, "meal": "Meal 2"},
-    "Tortilla": {"unit": "count", "base": 1, "cal": 70, "protein": 5, "fat": 2, "meal": "Meal 2"},
-    "Soya Chunks": {"unit": "g", "base": 50, "cal": 155, "protein": 27, "fat": 1, "meal": "Meal 2"},
-    
-    # Meal 3 Foods
-    "Whey Protein Shake": {"unit": "g", "base": 33, "cal": 120, "protein": 25, "fat": 0, "meal": "Meal 3"},
-}
-
-# Enhanced exercise data
-EXERCISE_DATA = {
-    "Chest": {"intensity_1": 100, "intensity_2": 150, "intensity_3": 200, "icon": "💪"},
-    "Back": {"intensity_1": 100, "intensity_2": 150, "intensity_3": 200, "icon": "🏋️"},
-    "Bicep": {"intensity_1": 80, "intensity_2": 120, "intensity_3": 160, "icon": "💪"},
-    "Tricep": {"intensity_1": 80, "intensity_2": 120, "intensity_3": 160, "icon": "💪"},
-    "Shoulder": {"intensity_1": 90, "intensity_2": 135, "intensity_3": 180, "icon": "🏋️"},
-    "Legs": {"intensity_1": 120, "intensity_2": 180, "intensity_3": 240, "icon": "🦵"},
-    "Cardio": {"intensity_1": 200, "intensity_2": 300, "intensity_3": 400, "icon": "🏃"},
-    "Full Body": {"intensity_1": 150, "intensity_2": 225, "intensity_3": 300, "icon": "💥"},
-}
-
-# Dynamic fitness goals based on workout day
-def get_daily_goals(is_gym_day=True):
-    if is_gym_day:
-        return {
-            "calories": {"min": 1300, "max": 1400, "optimal": 1350},
-            "protein": {"min": 140, "max": 145, "optimal": 142},
-            "water": {"min": 2000, "max": 4000, "optimal": 3000},
-            "steps": {"min": 8000, "max": 15000, "optimal": 10000},
-        }
-    else:
-        return {
-            "calories": {"min": 1100, "max": 1200, "optimal": 1150},
-            "protein": {"min": 100, "max": 120, "optimal": 110},
-            "water": {"min": 2000, "max": 4000, "optimal": 3000},
-            "steps": {"min": 8000, "max": 15000, "optimal": 10000},
-        }
-
-STEPS_PER_MILE = 1200
-CAL_PER_MILE = 100
-
-# ------------ Enhanced Utility Functions --------------
-
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    else:
-        return {}
-
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
-
-def calculate_macros(food_inputs):
-    """Calculate total macros from food input dict."""
-    total = {"cal": 0, "protein": 0, "fat": 0}
-    
-    for food, qty in food_inputs.items():
-        if qty is None or qty == 0:
-            continue
-        info = FOOD_DATA.get(food)
-        if not info:
-            continue
-            
-        if info["unit"] == "g":
-            ratio = qty / info["base"]
-            total["cal"] += info["cal"] * ratio
-            total["protein"] += info["protein"] * ratio
-            total["fat"] += info["fat"] * ratio
-        elif info["unit"] == "count":
-            total["cal"] += info["cal"] * qty
-            total["protein"] += info["protein"] * qty
-            total["fat"] += info["fat"] * qty
-    
-    return total
-
-def calculate_bmi(weight, height_cm):
-    if weight is None or height_cm is None or weight <= 0 or height_cm <= 0:
-        return None
-    height_m = height_cm / 100
-    bmi = weight / (height_m ** 2)
-    return round(bmi, 2)
-
-def get_bmi_category(bmi):
-    if bmi is None:
-        return "Unknown", "gray"
-    elif bmi < 18.5:
-        return "Underweight", "#3498db"
-    elif bmi < 25:
-        return "Normal", "#2ecc71"
-    elif bmi < 30:
-        return "Overweight", "#f39c12"
-    else:
-        return "Obese", "#e74c3c"
-
-def steps_to_miles_calories(steps):
-    miles = steps / STEPS_PER_MILE
-    cal_burned = miles * CAL_PER_MILE
-    return round(miles, 2), round(cal_burned, 1)
+def load_pandas():
+    """pandas, imported on first call: it is heavy, and only the pages and sections that build DataFrames need it."""
+    import pandas
+    return pandas
 
 def get_today_date_str():
     return datetime.now().strftime("%Y-%m-%d")
@@ -264,48 +157,50 @@ def create_metric_card(title, value, unit, icon, color="#667eea"):
     </div>
     """
 
-def plot_enhanced_trends(data, key, title, ylabel, color="#667eea"):
-    dates = sorted(data.keys())
-    values = [data[d].get(key, None) for d in dates]
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=dates, 
-        y=values, 
-        mode='lines+markers',
-        name=title,
-        line=dict(color=color, width=3),
-        marker=dict(size=8, color=color),
-        hovertemplate='<b>%{y}</b><br>%{x}<extra></extra>'
-    ))
-    
-    fig.update_layout(
-        title=dict(text=title, x=0.5, font=dict(size=18, color='#333')),
-        xaxis_title='Date',
-        yaxis_title=ylabel,
-        height=350,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(family="Arial", size=12),
-        hovermode='x',
-        showlegend=False
-    )
-    
-    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
-    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
-    
-    return fig
+# Figures are keyed on (user, metric, date range, data version, point budget); the
+# underscore-prefixed data argument is not hashed, the version stands in for it.
+# Shared across sessions, so callers must not mutate the returned figure.
+@st.cache_resource(max_entries=64)
+def cached_trend_figure(user, key, start_str, end_str, data_version, max_points, _data):
+    title, ylabel, color = PROGRESS_METRICS[key]
+    return plot_enhanced_trends(_data, key, title, ylabel, color, dates=list(_data), max_points=max_points)
+
+@st.cache_resource(max_entries=16)
+def cached_progress_overview(user, start_str, end_str, data_version, max_points, _data):
+    return plot_progress_overview(_data, PROGRESS_METRICS, dates=list(_data), max_points=max_points)
+
+# The trend engine always covers the whole diary, so the data version alone keys it
+@st.cache_resource(max_entries=16)
+def cached_weight_trends(user, data_version, _data, _dates):
+    from fittracker.trends import analyze_trends  # NumPy; only the Analytics page loads it
+    return analyze_trends(_data, _dates)
+
+@st.cache_resource(max_entries=16)
+def cached_weight_trend_figure(user, data_version, max_points, _trends):
+    return plot_weight_trend(_trends, max_points=max_points)
 
 # ----------- Enhanced Streamlit App -----------------
 
 # Load custom CSS
 load_custom_css()
 
-# Enhanced Authentication
+def switch_user(user):
+    """Sign user in (None signs out), dropping everything the previous account left in session state.
+
+    Daily Entry inputs, row lists, base versions and pending saves are keyed
+    by date only, so they must not carry over to the next account signing
+    in from the same browser session.
+    """
+    for key in list(st.session_state):
+        del st.session_state[key]
+    st.session_state.authenticated = user is not None
+    st.session_state.user = user
+
+# Enhanced Authentication: each account signs in to its own diary partition
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
 
-if not st.session_state.authenticated:
+if not st.session_state.authenticated or not st.session_state.get("user"):
     st.markdown("""
     <div class="main-header">
         <h1>💪 FitTracker Pro</h1>
@@ -313,21 +208,48 @@ if not st.session_state.authenticated:
     </div>
     """, unsafe_allow_html=True)
     
+    accounts = get_accounts()
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.markdown("### 🔐 Enter Your Secure Passcode")
-        password_input = st.text_input("", type="password", placeholder="Enter passcode...")
-        
-        if st.button("🚀 Access My Diary", use_container_width=True):
-            if password_input == PASSCODE:
-                st.session_state.authenticated = True
-                st.rerun()
-            else:
-                st.markdown('<div class="warning-box">❌ Incorrect passcode! Please try again.</div>', unsafe_allow_html=True)
+        sign_in_tab, sign_up_tab = st.tabs(["🔐 Sign In", "✨ Create Account"])
+        with sign_in_tab:
+            username_input = st.text_input("Username", key="login_username")
+            password_input = st.text_input("Password", type="password", key="login_password")
+            
+            if st.button("🚀 Access My Diary", use_container_width=True):
+                user = accounts.verify(username_input, password_input)
+                if user:
+                    switch_user(user)
+                    st.rerun()
+                else:
+                    st.markdown('<div class="warning-box">❌ Incorrect username or password! Please try again.</div>', unsafe_allow_html=True)
+        with sign_up_tab:
+            new_username = st.text_input("Choose a username", key="signup_username")
+            new_password = st.text_input("Choose a password", type="password", key="signup_password")
+            confirm_password = st.text_input("Confirm password", type="password", key="signup_confirm")
+            
+            if st.button("✨ Create My Diary", use_container_width=True):
+                if new_password != confirm_password:
+                    st.markdown('<div class="warning-box">❌ Passwords do not match!</div>', unsafe_allow_html=True)
+                else:
+                    try:
+                        # The first account inherits the diary kept before accounts existed
+                        user = accounts.create(new_username, new_password, claim_legacy=True)
+                    except ValueError as e:
+                        st.markdown(f'<div class="warning-box">❌ {e}</div>', unsafe_allow_html=True)
+                    else:
+                        switch_user(user)
+                        st.rerun()
     st.stop()
 
-# Load data
-data = load_data()
+user = st.session_state.user
+
+rerun_span = PROFILER.span("rerun")
+
+# Load data (shared across sessions; read-only, see get_entry for edits)
+with PROFILER.span("storage.snapshot"):
+    data, date_index, data_version = get_shared_diary(user=user).snapshot()
+rejected_days = get_shared_diary(user=user).rejected
 
 # Enhanced Header
 st.markdown("""
@@ -358,52 +280,394 @@ selected_date = st.sidebar.date_input(
 selected_date_str = selected_date.strftime("%Y-%m-%d")
 st.session_state.selected_date = selected_date_str
 
+if rejected_days:
+    with st.sidebar.expander(f"⚠️ {len(rejected_days)} stored day(s) failed validation"):
+        st.caption("These days are hidden until their stored data is fixed.")
+        for message in list(rejected_days.values())[:20]:
+            st.text(message)
+
 # Quick Stats in Sidebar
 if data and selected_date_str in data:
     entry = data[selected_date_str]
     st.sidebar.markdown("### 📊 Quick Stats")
-    st.sidebar.metric("Calories", f"{entry.get('total_calories', 0):.0f}", "kcal")
-    st.sidebar.metric("Protein", f"{entry.get('total_protein', 0):.1f}", "g")
-    st.sidebar.metric("Steps", f"{entry.get('steps', 0):,}")
+    st.sidebar.metric("Calories", f"{entry.total_calories:.0f}", "kcal")
+    st.sidebar.metric("Protein", f"{entry.total_protein:.1f}", "g")
+    st.sidebar.metric("Steps", f"{entry.steps:,}")
 
 # Helper function for entries
 def get_entry(date_str):
-    return data.get(date_str, {
-        "date": date_str,
-        "weight": None,
-        "height": 181.0,  # Default height
-        "age": 24,        # Default age
-        "bmi": None,
-        "steps": 0,
-        "workout_notes": "",
-        "food": {},
-        "additional_meals": [],
-        "exercises": [],
-        "total_calories": 0,
-        "total_protein": 0,
-        "net_calories": 0,
-        "is_gym_day": True,  # New field for workout day
-    })
+    # The shared, read-only record (or a blank one); saving edits a to_dict() copy
+    return data.get(date_str) or DayEntry(date_str)
 
 entry = get_entry(selected_date_str)
 
+@st.fragment(run_every=1)
+def show_report_progress(job_key):
+    """Poll a background report job; rerun the page once it's ready to download."""
+    job = get_report_runner().get(job_key)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.progress, text=job.message)
+
+# ----- Daily Entry sections -----
+# Each section is a fragment, so editing one of its fields reruns only that
+# section instead of the whole page. Fragment reruns can't hand values back
+# to the page, so every input lives in session state under a key ending in
+# the entry's date and the Save button reads the day from there.
+
+# meal -> (expander title, foods prefilled with one base serving, default for other count foods)
+MEAL_SECTIONS = {
+    "Meal 1": ("🌅 Meal 1 (Morning)", ["Oats", "Whey Protein", "Skim Milk Powder", "PB Powder", "Nuts"], 0),
+    "Meal 2": ("🌞 Meal 2 (Afternoon)", ["White Rice", "Yogurt", "Soya Chunks"], 1),
+    "Meal 3": ("🌙 Meal 3 (Evening)", ["Whey Protein Shake"], 0),
+}
+
+def daily_food_inputs(date_str, entry):
+    """The day's food quantities as currently entered across the meal and catalog sections."""
+    foods = list(FOOD_DATA) + st.session_state.get(f"catalog_foods_{date_str}", [])
+    # Catalog foods missing from the current catalog file have no widget; keep their logged amount
+    logged = entry.food
+    return {food: st.session_state.get(f"food_{food}_{date_str}", logged.get(food, 0.0)) for food in foods}
+
+def editable_rows(list_key, rows):
+    """This session's working copy of a list of entry rows (meals, workouts).
+
+    Each row carries a stable "_row" id for its widget keys, so removing a
+    row doesn't shift the typed values of the rows after it.
+    """
+    if list_key not in st.session_state:
+        st.session_state[list_key] = [{**row, "_row": i} for i, row in enumerate(rows)]
+    return st.session_state[list_key]
+
+def add_row(list_key, row):
+    rows = st.session_state[list_key]
+    rows.append({**row, "_row": max((r["_row"] for r in rows), default=-1) + 1})
+
+def remove_row(list_key, row_id):
+    st.session_state[list_key] = [r for r in st.session_state[list_key] if r["_row"] != row_id]
+
+def saved_rows(list_key):
+    return [{k: v for k, v in row.items() if k != "_row"} for row in st.session_state[list_key]]
+
+@st.fragment
+def meal_section(meal, date_str, entry):
+    title, prefilled, count_default = MEAL_SECTIONS[meal]
+    foods = [food for food, info in FOOD_DATA.items() if info.get("meal", "Meal 1") == meal]
+    logged = entry.food
+    with PROFILER.span(f"daily_entry.{meal.lower().replace(' ', '_')}"), st.expander(title, expanded=True):
+        cols = st.columns(2)
+        for i, food in enumerate(foods):
+            with cols[i % 2]:
+                info = FOOD_DATA[food]
+                unit_text = "grams" if info["unit"] == "g" else "count"
+                default_val = info["base"] if food in prefilled else (count_default if info["unit"] == "count" else 0)
+                st.number_input(
+                    f"{food} ({unit_text})",
+                    min_value=0.0,
+                    max_value=MAX_FOOD_QUANTITY,
+                    step=1.0,
+                    value=float(logged.get(food, default_val)),
+                    key=f"food_{food}_{date_str}",
+                    help=f"Calories per {info['base']}{info['unit'] if info['unit'] == 'g' else ' piece'}: {info['cal']}"
+                )
+        macros = calculate_macros({food: st.session_state[f"food_{food}_{date_str}"] for food in foods})
+        st.caption(f"{meal}: {macros['cal']:.0f} kcal · {macros['protein']:.1f} g protein")
+
+def remove_catalog_food(date_str, food):
+    st.session_state[f"catalog_foods_{date_str}"].remove(food)
+    del st.session_state[f"food_{food}_{date_str}"]
+
+@st.fragment
+def catalog_section(date_str, entry):
+    # Foods picked from the catalog join this day's food dict; only picked foods get a widget
+    picked_key = f"catalog_foods_{date_str}"
+    if picked_key not in st.session_state:
+        st.session_state[picked_key] = [food for food in entry.food_names if food not in FOOD_DATA]
+    picked_foods = st.session_state[picked_key]
+
+    with PROFILER.span("daily_entry.catalog"), st.expander("🔎 Food Catalog", expanded=bool(picked_foods)):
+        query = st.text_input("Search foods", key="catalog_query", placeholder="Start typing a food name…")
+        # The catalog (and NumPy with it) is only loaded once something needs it, then shared by every session
+        if query.strip() or picked_foods:
+            from fittracker.catalog import get_catalog
+            catalog = get_catalog()
+        else:
+            catalog = None
+        matches = catalog.search(query) if query.strip() else []
+        if matches:
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                pick = st.selectbox("Matches", matches, key="catalog_pick")
+            pick_info = catalog.get(pick)
+            with col2:
+                pick_qty = st.number_input(
+                    "grams" if pick_info["unit"] == "g" else "count",
+                    min_value=0.0, max_value=MAX_FOOD_QUANTITY, step=1.0, value=float(pick_info["base"]), key="catalog_qty"
+                )
+            with col3:
+                st.markdown("<br>", unsafe_allow_html=True)
+                add = st.button("➕ Add", key="catalog_add", use_container_width=True)
+            if add and pick in FOOD_DATA:
+                st.info(f"{pick} is already in the {FOOD_DATA[pick].get('meal', 'Meal 1')} list above; enter its amount there.")
+            elif add:
+                if pick not in picked_foods:
+                    picked_foods.append(pick)
+                st.session_state[f"food_{pick}_{date_str}"] = pick_qty
+        elif query.strip():
+            st.caption("No matching foods.")
+
+        cols = st.columns(2)
+        for i, food in enumerate(list(picked_foods)):
+            info = catalog.get(food) if catalog else None
+            if info is None:
+                continue  # not in the current catalog file; daily_food_inputs keeps its logged amount
+            with cols[i % 2]:
+                col_qty, col_remove = st.columns([4, 1])
+                if f"food_{food}_{date_str}" not in st.session_state:
+                    st.session_state[f"food_{food}_{date_str}"] = float(entry.food.get(food, info["base"]))
+                with col_qty:
+                    st.number_input(
+                        f"{food} ({'grams' if info['unit'] == 'g' else 'count'})",
+                        min_value=0.0,
+                        max_value=MAX_FOOD_QUANTITY,
+                        step=1.0,
+                        key=f"food_{food}_{date_str}",
+                        help=f"Calories per {info['base']:g}{info['unit'] if info['unit'] == 'g' else ' piece'}: {info['cal']:g}"
+                    )
+                with col_remove:
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.button("❌", key=f"remove_food_{food}", on_click=remove_catalog_food, args=(date_str, food))
+
+@st.fragment
+def additional_meals_section(date_str, entry):
+    list_key = f"additional_meals_{date_str}"
+    rows = editable_rows(list_key, entry.additional_meals)
+    with PROFILER.span("daily_entry.additional_meals"), st.expander("➕ Additional Meals", expanded=False):
+        for i, row in enumerate(rows):
+            col1, col2, col3 = st.columns([3, 2, 1])
+            with col1:
+                row["name"] = st.text_input(f"Meal Name #{i+1}", value=row.get("name", ""), key=f"add_meal_name_{row['_row']}_{date_str}")
+            with col2:
+                row["calories"] = st.number_input(f"Calories #{i+1}", min_value=0.0, value=float(row.get("calories", 0.0)), key=f"add_meal_cal_{row['_row']}_{date_str}")
+            with col3:
+                st.button("❌", key=f"remove_add_meal_{row['_row']}_{date_str}", on_click=remove_row, args=(list_key, row["_row"]))
+
+        st.button("➕ Add Additional Meal", on_click=add_row, args=(list_key, {"name": "", "calories": 0.0}))
+
+@st.fragment
+def body_metrics_section(date_str, entry):
+    with PROFILER.span("daily_entry.body_metrics"):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("### 📏 Quick Body Check")
+            weight = st.number_input("Weight (kg)", min_value=20.0, max_value=300.0, step=0.1, value=entry.weight if entry.weight is not None else 70.0, key=f"weight_{date_str}")
+
+            # Auto-calculate and show BMI
+            height = entry.height
+            age = entry.age
+            bmi = calculate_bmi(weight, height)
+
+            if bmi is not None:
+                bmi_cat, bmi_color = get_bmi_category(bmi)
+                st.markdown(f"""
+                <div style="background: {bmi_color}20; border-left: 4px solid {bmi_color}; padding: 10px; border-radius: 5px; margin: 10px 0;">
+                    <strong>BMI: {bmi}</strong> ({bmi_cat})<br>
+                    <small>Height: {height}cm | Age: {age}</small>
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                st.info("Enter weight to calculate BMI")
+
+        with col2:
+            st.markdown("### 🚶‍♂️ Activity Tracking")
+
+            # Step Count Input
+            steps = st.number_input("Steps Today", min_value=0, max_value=MAX_DAILY_STEPS, step=100, value=entry.steps, key=f"steps_{date_str}")
+
+            # Calculate calories from steps
+            if steps > 0:
+                miles, step_calories = steps_to_miles_calories(steps)
+                st.info(f"🔥 Steps burned: {step_calories:.0f} calories ({miles:.1f} miles)")
+
+@st.fragment
+def exercise_section(date_str, entry):
+    list_key = f"exercises_{date_str}"
+    rows = editable_rows(list_key, entry.exercises)
+    with PROFILER.span("daily_entry.exercises"):
+        # Enhanced Exercise Tracking
+        st.markdown("### 🏋️‍♂️ Workout Tracking")
+        for i, row in enumerate(rows):
+            col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+            with col1:
+                row["type"] = st.text_input(f"Workout #{i+1}", value=row.get("type", ""), key=f"workout_type_{row['_row']}_{date_str}", placeholder="e.g., Chest, Back, Cardio")
+            with col2:
+                row["intensity"] = st.selectbox(f"Intensity #{i+1}", [1, 2, 3],
+                                                index=row.get("intensity", 1)-1,
+                                                key=f"intensity_{row['_row']}_{date_str}",
+                                                help="1=Light(100cal), 2=Medium(150cal), 3=Heavy(200cal)")
+            with col3:
+                # Calculate calories based on intensity
+                row["calories"] = WORKOUT_CALORIES.get(row["intensity"], 100)
+                st.metric("Calories", f"{row['calories']}")
+            with col4:
+                st.button("❌", key=f"remove_workout_{row['_row']}_{date_str}", on_click=remove_row, args=(list_key, row["_row"]))
+
+        st.button("➕ Add Workout", on_click=add_row, args=(list_key, {"type": "", "intensity": 1, "calories": 100}))
+
+        # OR Direct Calorie Input
+        st.markdown("#### 🔥 Or Enter Calories Burned Directly")
+        st.number_input("Total Workout Calories", min_value=0, max_value=2000, step=10, value=int(entry.direct_calories), key=f"direct_calories_{date_str}")
+
+        # Workout Notes
+        st.text_area("📝 Workout Notes", value=entry.workout_notes, height=80, key=f"workout_notes_{date_str}")
+
+# ----- History browser -----
+# Also a fragment: paging, sorting and filtering rerun only the table, and
+# each rerun asks storage for just the visible page of days.
+
+HISTORY_SORT_LABELS = {
+    "date": "Date", "weight": "Weight", "total_calories": "Calories",
+    "total_protein": "Protein", "net_calories": "Net Calories", "steps": "Steps",
+}
+HISTORY_CHOICES = {"Any": None, "Yes": True, "No": False}
+
+def reset_history_page():
+    st.session_state.history_page = 0
+
+def turn_history_page(step):
+    st.session_state.history_page += step
+
+def show_history_day(hist_entry):
+    pd = load_pandas()
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### 📊 Metrics")
+        metrics_df = pd.DataFrame({
+            "Metric": ["Weight", "BMI", "Calories", "Protein", "Steps"],
+            "Value": [
+                f"{hist_entry.get('weight', 'N/A')} kg",
+                hist_entry.get('bmi', 'N/A'),
+                f"{hist_entry.total_calories:.0f} kcal",
+                f"{hist_entry.total_protein:.1f} g",
+                f"{hist_entry.steps:,}",
+            ]
+        })
+        st.dataframe(metrics_df, use_container_width=True)
+    
+    with col2:
+        st.markdown("#### 🍽️ Food Intake")
+        food_data = hist_entry.food
+        if food_data:
+            food_df = pd.DataFrame(list(food_data.items()), columns=["Food", "Quantity"])
+            food_df = food_df[food_df["Quantity"] > 0]  # Only show consumed foods
+            st.dataframe(food_df, use_container_width=True)
+        else:
+            st.info("No food data recorded")
+    
+    # Exercise data
+    if hist_entry.exercises:
+        st.markdown("#### 🏋️‍♂️ Exercise Data")
+        exercise_df = pd.DataFrame(list(hist_entry.exercises))
+        st.dataframe(exercise_df, use_container_width=True)
+    
+    # Notes
+    if hist_entry.workout_notes:
+        st.markdown("#### 📝 Notes")
+        st.text_area("Workout Notes", hist_entry.workout_notes, disabled=True)
+
+@st.fragment
+def history_browser(user):
+    pd = load_pandas()
+    with PROFILER.span("history.page"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            sort = st.selectbox("Sort by", list(HISTORY_SORT_LABELS), format_func=HISTORY_SORT_LABELS.get,
+                                key="history_sort", on_change=reset_history_page)
+            descending = st.toggle("Newest / highest first", value=True, key="history_descending", on_change=reset_history_page)
+        with col2:
+            gym_day = st.selectbox("Gym day", list(HISTORY_CHOICES), key="history_gym_day", on_change=reset_history_page)
+            goal_met = st.selectbox("All goals met", list(HISTORY_CHOICES), key="history_goal_met", on_change=reset_history_page)
+        with col3:
+            weight_min = st.number_input("Min weight (kg)", min_value=0.0, max_value=300.0, value=None, step=0.5,
+                                         key="history_weight_min", on_change=reset_history_page)
+            weight_max = st.number_input("Max weight (kg)", min_value=0.0, max_value=300.0, value=None, step=0.5,
+                                         key="history_weight_max", on_change=reset_history_page)
+        with col4:
+            page_size = st.selectbox("Rows per page", [25, 50, 100], key="history_page_size", on_change=reset_history_page)
+        
+        # Filters, sort and paging all run in the storage layer; only this page's days come back
+        query = dict(
+            sort=sort, descending=descending, gym_day=HISTORY_CHOICES[gym_day], goal_met=HISTORY_CHOICES[goal_met],
+            weight_range=(weight_min, weight_max) if weight_min is not None or weight_max is not None else None,
+        )
+        diary = get_shared_diary(user=user)
+        page_no = st.session_state.setdefault("history_page", 0)
+        total, rows = diary.page(page_no * page_size, page_size, **query)
+        pages = max(1, -(-total // page_size))
+        if page_no >= pages:
+            # The diary shrank under this page (or the filters did); show the last one
+            page_no = st.session_state.history_page = pages - 1
+            total, rows = diary.page(page_no * page_size, page_size, **query)
+        
+        if not rows:
+            st.info("No days match these filters.")
+            return
+        table = pd.DataFrame({
+            "Date": [d for d, _ in rows],
+            "Gym Day": ["✅" if e.is_gym_day else "—" for _, e in rows],
+            "Weight (kg)": [e.weight for _, e in rows],
+            "Calories": [round(e.total_calories) for _, e in rows],
+            "Protein (g)": [e.total_protein for _, e in rows],
+            "Net Calories": [round(e.net_calories) for _, e in rows],
+            "Steps": [e.steps for _, e in rows],
+            "Goals Met": ["✅" if entry_goals_met(e)["all"] else "—" for _, e in rows],
+        })
+        st.dataframe(table, use_container_width=True, hide_index=True)
+        
+        col1, col2, col3 = st.columns([1, 3, 1])
+        with col1:
+            st.button("◀ Previous", disabled=page_no == 0, on_click=turn_history_page, args=(-1,), use_container_width=True)
+        with col2:
+            st.caption(f"Page {page_no + 1:,} of {pages:,} · {total:,} matching days")
+        with col3:
+            st.button("Next ▶", disabled=page_no >= pages - 1, on_click=turn_history_page, args=(1,), use_container_width=True)
+        
+        # Drill-down: a day's food and workouts are only rendered once it's picked
+        page_entries = dict(rows)
+        detail_date = st.selectbox("🔍 Day details", list(page_entries), index=None,
+                                   placeholder="Pick a day on this page", key="history_detail")
+        if detail_date in page_entries:
+            show_history_day(page_entries[detail_date])
+
+page_span = PROFILER.span(f"page.{page.split(' ', 1)[1]}")
+
 # ----- PAGE: Daily Entry -----
 if page == "📝 Daily Entry":
     st.markdown(f"### 📝 Daily Entry - {selected_date_str}")
     
+    # The version this session's edits of the day start from; saving checks it
+    # so an edit made on stale data can't silently overwrite another tab's save
+    base_version_key = f"base_version_{selected_date_str}"
+    if base_version_key not in st.session_state:
+        st.session_state[base_version_key] = entry_version(entry)
+    
     # Gym Day Toggle
-    is_gym_day = st.toggle("🏋️ Gym Day", value=entry.get("is_gym_day", True))
+    is_gym_day = st.toggle("🏋️ Gym Day", value=entry.is_gym_day)
     DAILY_GOALS = get_daily_goals(is_gym_day)
     
+    section_span = PROFILER.span("daily_entry.goal_cards")
+    
     # Clickable Daily Goals Overview
     st.markdown("### 🎯 Daily Goals (Click to Highlight Achievement)")
     
     col1, col2, col3, col4 = st.columns(4)
     
     # Calculate current values for goal checking
-    current_cal = entry.get("total_calories", 0)
-    current_protein = entry.get("total_protein", 0)
-    current_steps = entry.get("steps", 0)
+    current_cal = entry.total_calories
+    current_protein = entry.total_protein
+    current_steps = entry.steps
     
     with col1:
         cal_achieved = current_cal >= DAILY_GOALS["calories"]["optimal"] * 0.9
@@ -442,7 +706,7 @@ if page == "📝 Daily Entry":
         """, unsafe_allow_html=True)
     
     with col4:
-        bmi = entry.get("bmi")
+        bmi = entry.bmi
         bmi_normal = (18.5 <= bmi <= 25) if bmi is not None else False
         if st.button("⚖️ BMI Status", key="bmi_goal"):
             st.balloons() if bmi_normal else None
@@ -455,105 +719,23 @@ if page == "📝 Daily Entry":
         </div>
         """, unsafe_allow_html=True)
 
+    section_span.end()
+    
     # Enhanced Food Input organized by Meals
     st.markdown("## 🍽️ Nutrition Tracking")
+    for meal in MEAL_SECTIONS:
+        meal_section(meal, selected_date_str, entry)
+    catalog_section(selected_date_str, entry)
+    additional_meals_section(selected_date_str, entry)
     
-    # Group foods by meal
-    meal_foods = {
-        "Meal 1": [],
-        "Meal 2": [],
-        "Meal 3": []
-    }
-    
-    for food, info in FOOD_DATA.items():
-        meal = info.get("meal", "Meal 1")
-        meal_foods[meal].append(food)
-    
-    food_inputs = {}
-    
-    # Meal 1
-    with st.expander("🌅 Meal 1 (Morning)", expanded=True):
-        cols = st.columns(2)
-        for i, food in enumerate(meal_foods["Meal 1"]):
-            with cols[i % 2]:
-                info = FOOD_DATA[food]
-                unit_text = "grams" if info["unit"] == "g" else "count"
-                default_val = info["base"] if food in ["Oats", "Whey Protein", "Skim Milk Powder", "PB Powder", "Nuts"] else 0
-                food_inputs[food] = st.number_input(
-                    f"{food} ({unit_text})",
-                    min_value=0.0,
-                    max_value=1000.0,
-                    step=1.0,
-                    value=float(entry["food"].get(food, default_val)),
-                    key=f"food_{food}",
-                    help=f"Calories per {info['base']}{info['unit'] if info['unit'] == 'g' else ' piece'}: {info['cal']}"
-                )
-    
-    # Meal 2
-    with st.expander("🌞 Meal 2 (Afternoon)", expanded=True):
-        cols = st.columns(2)
-        for i, food in enumerate(meal_foods["Meal 2"]):
-            with cols[i % 2]:
-                info = FOOD_DATA[food]
-                unit_text = "grams" if info["unit"] == "g" else "count"
-                default_val = info["base"] if food in ["White Rice", "Yogurt", "Soya Chunks"] else (1 if info["unit"] == "count" else 0)
-                food_inputs[food] = st.number_input(
-                    f"{food} ({unit_text})",
-                    min_value=0.0,
-                    max_value=1000.0,
-                    step=1.0,
-                    value=float(entry["food"].get(food, default_val)),
-                    key=f"food_{food}",
-                    help=f"Calories per {info['base']}{info['unit'] if info['unit'] == 'g' else ' piece'}: {info['cal']}"
-                )
-    
-    # Meal 3
-    with st.expander("🌙 Meal 3 (Evening)", expanded=True):
-        cols = st.columns(2)
-        for i, food in enumerate(meal_foods["Meal 3"]):
-            with cols[i % 2]:
-                info = FOOD_DATA[food]
-                unit_text = "grams" if info["unit"] == "g" else "count"
-                default_val = info["base"] if food == "Whey Protein Shake" else 0
-                food_inputs[food] = st.number_input(
-                    f"{food} ({unit_text})",
-                    min_value=0.0,
-                    max_value=1000.0,
-                    step=1.0,
-                    value=float(entry["food"].get(food, default_val)),
-                    key=f"food_{food}",
-                    help=f"Calories per {info['base']}{info['unit'] if info['unit'] == 'g' else ' piece'}: {info['cal']}"
-                )
-
-    # Additional Meals Section
-    with st.expander("➕ Additional Meals", expanded=False):
-        additional_meals = entry.get("additional_meals", [])
-        new_additional_meals = []
-        
-        for i in range(len(additional_meals)):
-            col1, col2, col3 = st.columns([3, 2, 1])
-            with col1:
-                name = st.text_input(f"Meal Name #{i+1}", value=additional_meals[i].get("name", ""), key=f"add_meal_name_{i}")
-            with col2:
-                cal = st.number_input(f"Calories #{i+1}", min_value=0.0, value=additional_meals[i].get("calories", 0.0), key=f"add_meal_cal_{i}")
-            with col3:
-                if st.button("❌", key=f"remove_add_meal_{i}"):
-                    continue
-            new_additional_meals.append({"name": name, "calories": cal})
-        
-        if st.button("➕ Add Additional Meal"):
-            new_additional_meals.append({"name": "", "calories": 0.0})
-        
-        additional_meals = new_additional_meals
-
     # Calculate and Show Current Totals
     st.markdown("## 📊 Current Meal Summary")
     
     # Add Calculate Button
     if st.button("🧮 Calculate Current Intake", type="secondary", use_container_width=True):
         # Calculate current macros
-        current_macros = calculate_macros(food_inputs)
-        additional_cal = sum(item.get("calories", 0) for item in additional_meals)
+        current_macros = calculate_macros(daily_food_inputs(selected_date_str, entry))
+        additional_cal = sum(item.get("calories", 0) for item in saved_rows(f"additional_meals_{selected_date_str}"))
         total_current_cal = current_macros["cal"] + additional_cal
         total_current_protein = current_macros["protein"]
         
@@ -575,136 +757,76 @@ if page == "📝 Daily Entry":
             st.metric("Goal Progress", f"{st.session_state.calorie_progress:.1f}%", "of daily goal")
     else:
         st.info("👆 Click 'Calculate Current Intake' to see your meal totals")
-
+    
     # Body Metrics & Exercise Tracking
     st.markdown("## 🏃‍♂️ Body Metrics & Exercise")
+    body_metrics_section(selected_date_str, entry)
+    exercise_section(selected_date_str, entry)
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("### 📏 Quick Body Check")
-        weight = st.number_input("Weight (kg)", min_value=20.0, max_value=300.0, step=0.1, value=entry.get("weight") if entry.get("weight") is not None else 70.0)
-        
-        # Auto-calculate and show BMI
-        height = entry.get("height", 181.0)
-        age = entry.get("age", 24)
-        bmi = calculate_bmi(weight, height)
-        
-        if bmi is not None:
-            bmi_cat, bmi_color = get_bmi_category(bmi)
-            st.markdown(f"""
-            <div style="background: {bmi_color}20; border-left: 4px solid {bmi_color}; padding: 10px; border-radius: 5px; margin: 10px 0;">
-                <strong>BMI: {bmi}</strong> ({bmi_cat})<br>
-                <small>Height: {height}cm | Age: {age}</small>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.info("Enter weight to calculate BMI")
-        
-    with col2:
-        st.markdown("### 🚶‍♂️ Activity Tracking")
-        
-        # Step Count Input
-        steps = st.number_input("Steps Today", min_value=0, max_value=100000, step=100, value=entry.get("steps", 0))
-        
-        # Calculate calories from steps
-        if steps > 0:
-            miles, step_calories = steps_to_miles_calories(steps)
-            st.info(f"🔥 Steps burned: {step_calories:.0f} calories ({miles:.1f} miles)")
-
-    # Enhanced Exercise Tracking
-    st.markdown("### 🏋️‍♂️ Workout Tracking")
-    exercises = entry.get("exercises", [])
-    new_exercises = []
-    
-    for i, exercise in enumerate(exercises):
-        col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
-        with col1:
-            workout_type = st.text_input(f"Workout #{i+1}", value=exercise.get("type", ""), key=f"workout_type_{i}", placeholder="e.g., Chest, Back, Cardio")
-        with col2:
-            intensity = st.selectbox(f"Intensity #{i+1}", [1, 2, 3], 
-                                   index=exercise.get("intensity", 1)-1, 
-                                   key=f"intensity_{i}",
-                                   help="1=Light(100cal), 2=Medium(150cal), 3=Heavy(200cal)")
-        with col3:
-            # Calculate calories based on intensity
-            base_cal = {1: 100, 2: 150, 3: 200}
-            calories = base_cal.get(intensity, 100)
-            st.metric("Calories", f"{calories}")
-        with col4:
-            if st.button("❌", key=f"remove_workout_{i}"):
-                continue
-        new_exercises.append({"type": workout_type, "intensity": intensity, "calories": calories})
-    
-    if st.button("➕ Add Workout"):
-        new_exercises.append({"type": "", "intensity": 1, "calories": 100})
-    
-    exercises = new_exercises
-    
-    # OR Direct Calorie Input
-    st.markdown("#### 🔥 Or Enter Calories Burned Directly")
-    direct_calories = st.number_input("Total Workout Calories", min_value=0, max_value=2000, step=10, value=0)
-    
-    # Workout Notes
-    workout_notes = st.text_area("📝 Workout Notes", value=entry.get("workout_notes", ""), height=80)
-
     # Enhanced Save Button
     if st.button("💾 Save Daily Entry", type="primary", use_container_width=True):
-        # Calculate all metrics
-        macros = calculate_macros(food_inputs)
-        additional_cal = sum(item.get("calories", 0) for item in additional_meals)
-        exercise_cal = sum(ex.get("calories", 0) for ex in exercises) + direct_calories
-        
-        total_calories = macros["cal"] + additional_cal
-        total_protein = macros["protein"]
-        
-        miles, step_calories = steps_to_miles_calories(steps)
-        total_calories_burned = step_calories + exercise_cal
-        net_calories = total_calories - total_calories_burned
-        
-        bmi = calculate_bmi(weight, 181.0)  # Use fixed height
-        
-        # Update entry
+        # Update an editable copy of the entry, then calculate all metrics from it.
+        # Every section keeps its inputs in session state, so this reads
+        # them all even if only one section reran since the last full run
+        stored = entry
+        entry = stored.to_dict()
         entry.update({
-            "food": food_inputs,
-            "additional_meals": additional_meals,
-            "exercises": exercises,
-            "weight": weight,
-            "height": 181.0,  # Fixed height
-            "age": 24,        # Fixed age
-            "steps": steps,
-            "workout_notes": workout_notes,
-            "direct_calories": direct_calories,
+            "food": daily_food_inputs(selected_date_str, stored),
+            "additional_meals": saved_rows(f"additional_meals_{selected_date_str}"),
+            "exercises": saved_rows(f"exercises_{selected_date_str}"),
+            "weight": st.session_state[f"weight_{selected_date_str}"],
+            "steps": st.session_state[f"steps_{selected_date_str}"],
+            "workout_notes": st.session_state[f"workout_notes_{selected_date_str}"],
+            "direct_calories": st.session_state[f"direct_calories_{selected_date_str}"],
             "is_gym_day": is_gym_day,
-            "bmi": bmi,
-            "total_calories": round(total_calories, 1),
-            "total_protein": round(total_protein, 1),
-            "total_calories_burned": round(total_calories_burned, 1),
-            "net_calories": round(net_calories, 1),
-            "miles_walked": miles,
             "date": selected_date_str
         })
+        entry.update(compute_entry_totals(entry))
         
-        data[selected_date_str] = entry
-        save_data(data)
-        
-        st.markdown('<div class="success-box">✅ Entry saved successfully!</div>', unsafe_allow_html=True)
-        
-        # Show summary after saving
-        st.markdown("### 📊 Saved Summary")
-        col1, col2, col3 = st.columns(3)
+        try:
+            saved = save_entry(selected_date_str, entry, user=user, expected_version=st.session_state[base_version_key])
+        except ConflictError:
+            st.session_state.pending_save = (selected_date_str, entry)
+        else:
+            st.session_state[base_version_key] = entry_version(saved)
+            st.markdown('<div class="success-box">✅ Entry saved successfully!</div>', unsafe_allow_html=True)
+            
+            # Show summary after saving
+            st.markdown("### 📊 Saved Summary")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Calories", f"{entry['total_calories']:.0f}", "kcal")
+            with col2:
+                st.metric("Total Protein", f"{entry['total_protein']:.1f}", "g")
+            with col3:
+                st.metric("Net Calories", f"{entry['net_calories']:.0f}", "after exercise")
+    
+    # A save that lost the race: let the user pick which version of the day survives
+    pending_save = st.session_state.get("pending_save")
+    if pending_save and pending_save[0] == selected_date_str:
+        st.markdown('<div class="warning-box">⚠️ This day was saved from another tab or device after you opened it. Nothing was overwritten.</div>', unsafe_allow_html=True)
+        col1, col2 = st.columns(2)
         with col1:
-            st.metric("Total Calories", f"{total_calories:.0f}", "kcal")
+            if st.button("🔄 Load Their Version", use_container_width=True):
+                del st.session_state.pending_save
+                del st.session_state[base_version_key]
+                # Inputs are keyed by date, so this drops every edit of the day
+                for key in [k for k in st.session_state if k.endswith(f"_{selected_date_str}")]:
+                    del st.session_state[key]
+                st.rerun()
         with col2:
-            st.metric("Total Protein", f"{total_protein:.1f}", "g")
-        with col3:
-            st.metric("Net Calories", f"{net_calories:.0f}", "after exercise")
+            if st.button("💾 Keep Mine", use_container_width=True):
+                saved = save_entry(selected_date_str, pending_save[1], user=user)
+                del st.session_state.pending_save
+                st.session_state[base_version_key] = entry_version(saved)
+                st.markdown('<div class="success-box">✅ Entry saved successfully!</div>', unsafe_allow_html=True)
 
 # ----- PAGE: Analytics -----
 elif page == "📊 Analytics":
+    pd = load_pandas()
     st.markdown("### 📊 Today's Analytics")
     
-    if entry.get("total_calories"):
+    if entry.total_calories:
         # Current Progress
         col1, col2 = st.columns([2, 1])
         
@@ -712,12 +834,12 @@ elif page == "📊 Analytics":
             st.markdown("#### 🎯 Daily Goals Progress")
             
             # Get current goals
-            is_gym_day = entry.get("is_gym_day", True)
+            is_gym_day = entry.is_gym_day
             DAILY_GOALS = get_daily_goals(is_gym_day)
             
             # Progress bars
             cal_progress = create_progress_bar(
-                entry.get("total_calories", 0), 
+                entry.total_calories, 
                 DAILY_GOALS["calories"]["optimal"], 
                 "Calories", 
                 "#e74c3c"
@@ -725,7 +847,7 @@ elif page == "📊 Analytics":
             st.markdown(cal_progress, unsafe_allow_html=True)
             
             protein_progress = create_progress_bar(
-                entry.get("total_protein", 0), 
+                entry.total_protein, 
                 DAILY_GOALS["protein"]["optimal"], 
                 "Protein (g)", 
                 "#2ecc71"
@@ -733,7 +855,7 @@ elif page == "📊 Analytics":
             st.markdown(protein_progress, unsafe_allow_html=True)
             
             steps_progress = create_progress_bar(
-                entry.get("steps", 0), 
+                entry.steps, 
                 DAILY_GOALS["steps"]["optimal"], 
                 "Steps", 
                 "#f39c12"
@@ -744,27 +866,27 @@ elif page == "📊 Analytics":
             st.markdown("#### 📋 Quick Stats")
             
             # BMI Analysis
-            bmi = entry.get("bmi")
+            bmi = entry.bmi
             if bmi:
                 bmi_cat, bmi_color = get_bmi_category(bmi)
                 st.markdown(create_metric_card("BMI", f"{bmi}", bmi_cat, "⚖️", bmi_color), unsafe_allow_html=True)
             
             # Net Calories
-            net_cal = entry.get("net_calories", 0)
+            net_cal = entry.net_calories
             net_color = "#2ecc71" if net_cal > 0 else "#e74c3c"
             st.markdown(create_metric_card("Net Calories", f"{net_cal:.0f}", "kcal", "⚡", net_color), unsafe_allow_html=True)
 
         # Daily Goals Achievement
-        if entry.get("total_calories", 0) > 0:
+        if entry.total_calories > 0:
             st.markdown("#### 🥘 Daily Goals Achievement")
             
             # Check if all goals are met
             goals_met = 0
             total_goals = 3
             
-            cal_achieved = entry.get("total_calories", 0) >= DAILY_GOALS["calories"]["optimal"] * 0.9
-            protein_achieved = entry.get("total_protein", 0) >= DAILY_GOALS["protein"]["optimal"] * 0.9
-            steps_achieved = entry.get("steps", 0) >= DAILY_GOALS["steps"]["optimal"] * 0.9
+            cal_achieved = entry.total_calories >= DAILY_GOALS["calories"]["optimal"] * 0.9
+            protein_achieved = entry.total_protein >= DAILY_GOALS["protein"]["optimal"] * 0.9
+            steps_achieved = entry.steps >= DAILY_GOALS["steps"]["optimal"] * 0.9
             
             if cal_achieved: goals_met += 1
             if protein_achieved: goals_met += 1
@@ -790,13 +912,45 @@ elif page == "📊 Analytics":
                 """, unsafe_allow_html=True)
         
         # Exercise Summary
-        if entry.get("exercises"):
+        if entry.exercises:
             st.markdown("#### 🏋️‍♂️ Exercise Summary")
-            exercise_df = pd.DataFrame(entry["exercises"])
+            exercise_df = pd.DataFrame(list(entry.exercises))
             st.dataframe(exercise_df[["type", "intensity", "calories"]], use_container_width=True)
             
     else:
         st.info("📝 No data available for today. Please enter your daily data first!")
+    
+    # Whole-history trend weight, maintenance estimate and goal projection
+    st.markdown("### 📉 Weight Trend & Maintenance")
+    with PROFILER.span("analytics.trends"):
+        trends = cached_weight_trends(user, data_version, data, date_index.dates)
+        current = trends.current()
+    if current["trend_weight"] is None:
+        st.info("⚖️ Log your weight to see your trend and projections.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Trend Weight", f"{current['trend_weight']:.1f} kg")
+        with col2:
+            rate = current["weekly_rate"]
+            st.metric("Weekly Change", "—" if rate is None else f"{rate:+.2f} kg")
+        with col3:
+            tdee = current["tdee"]
+            st.metric("Maintenance (TDEE)", "—" if tdee is None else f"{tdee:.0f} kcal",
+                      help="Average logged intake over the last 4 weeks, corrected by how fast your trend weight moved")
+        
+        target = st.number_input("🎯 Target weight (kg)", min_value=30.0, max_value=300.0, step=0.5,
+                                 value=min(300.0, max(30.0, float(round(current["trend_weight"]) - 5))), key="target_weight")
+        target_date = trends.projected_date(target)
+        if target_date is None:
+            st.markdown('<div class="warning-box">⚠️ At your current rate your trend is not heading towards this target.</div>', unsafe_allow_html=True)
+        else:
+            days_left = (target_date - datetime.now().date()).days
+            when = f" (in about {days_left:,} days)" if days_left > 0 else ""
+            st.markdown(f'<div class="success-box">📅 Projected to reach {target:.1f} kg around <b>{target_date:%d %b %Y}</b>{when}.</div>', unsafe_allow_html=True)
+        
+        point_budget = st.session_state.get("plot_point_budget", PLOT_POINT_BUDGET)
+        st.plotly_chart(cached_weight_trend_figure(user, data_version, point_budget, trends), use_container_width=True)
 
 # ----- PAGE: Progress -----
 elif page == "📈 Progress":
@@ -808,33 +962,28 @@ elif page == "📈 Progress":
         # Date range selector
         col1, col2 = st.columns(2)
         with col1:
-            days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90], index=0)
+            days_back = st.selectbox("Time Period", [7, 14, 30, 60, 90, 180, 365, 730, 1825, 3650], index=0)
         with col2:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days_back)
+            combined = st.toggle("📊 Single combined chart", value=False)
         
-        # Filter data
-        filtered_data = {
-            k: v for k, v in data.items() 
-            if start_date.strftime("%Y-%m-%d") <= k <= end_date.strftime("%Y-%m-%d")
-        }
+        start_str = start_date.strftime("%Y-%m-%d")
+        end_str = end_date.strftime("%Y-%m-%d")
+        point_budget = st.session_state.get("plot_point_budget", PLOT_POINT_BUDGET)
+        # Filter data (binary search on the shared date index, already in date order)
+        filtered_data = {d: data[d] for d in date_index.range(start_str, end_str)}
         
         if filtered_data:
-            # Weight Progress
-            weight_fig = plot_enhanced_trends(filtered_data, "weight", "Weight Progress (kg)", "Weight (kg)", "#e74c3c")
-            st.plotly_chart(weight_fig, use_container_width=True)
-            
-            # Calories Trend
-            cal_fig = plot_enhanced_trends(filtered_data, "total_calories", "Calorie Intake Trend", "Calories", "#f39c12")
-            st.plotly_chart(cal_fig, use_container_width=True)
-            
-            # Protein Trend
-            protein_fig = plot_enhanced_trends(filtered_data, "total_protein", "Protein Intake Trend", "Protein (g)", "#2ecc71")
-            st.plotly_chart(protein_fig, use_container_width=True)
-            
-            # Steps Trend
-            steps_fig = plot_enhanced_trends(filtered_data, "steps", "Daily Steps Trend", "Steps", "#3498db")
-            st.plotly_chart(steps_fig, use_container_width=True)
+            with PROFILER.span("progress.charts"):
+                if combined:
+                    overview_fig = cached_progress_overview(user, start_str, end_str, data_version, point_budget, filtered_data)
+                    st.plotly_chart(overview_fig, use_container_width=True)
+                else:
+                    # Weight, calories, protein and steps, each from the figure cache
+                    for key in PROGRESS_METRICS:
+                        fig = cached_trend_figure(user, key, start_str, end_str, data_version, point_budget, filtered_data)
+                        st.plotly_chart(fig, use_container_width=True, key=f"progress_{key}")
 
 # ----- PAGE: History -----
 elif page == "📋 History":
@@ -843,53 +992,11 @@ elif page == "📋 History":
     if not data:
         st.info("📝 No historical data available yet.")
     else:
-        # Date selector
-        dates_sorted = sorted(data.keys(), reverse=True)
-        selected_history_date = st.selectbox("Select Date", dates_sorted, index=0)
-        
-        if selected_history_date:
-            hist_entry = data[selected_history_date]
-            
-            # Display historical data in organized format
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("#### 📊 Metrics")
-                metrics_df = pd.DataFrame({
-                    "Metric": ["Weight", "BMI", "Calories", "Protein", "Steps"],
-                    "Value": [
-                        f"{hist_entry.get('weight', 'N/A')} kg",
-                        hist_entry.get('bmi', 'N/A'),
-                        f"{hist_entry.get('total_calories', 0):.0f} kcal",
-                        f"{hist_entry.get('total_protein', 0):.1f} g",
-                        f"{hist_entry.get('steps', 0):,}",
-                    ]
-                })
-                st.dataframe(metrics_df, use_container_width=True)
-            
-            with col2:
-                st.markdown("#### 🍽️ Food Intake")
-                food_data = hist_entry.get("food", {})
-                if food_data:
-                    food_df = pd.DataFrame(list(food_data.items()), columns=["Food", "Quantity"])
-                    food_df = food_df[food_df["Quantity"] > 0]  # Only show consumed foods
-                    st.dataframe(food_df, use_container_width=True)
-                else:
-                    st.info("No food data recorded")
-            
-            # Exercise data
-            if hist_entry.get("exercises"):
-                st.markdown("#### 🏋️‍♂️ Exercise Data")
-                exercise_df = pd.DataFrame(hist_entry["exercises"])
-                st.dataframe(exercise_df, use_container_width=True)
-            
-            # Notes
-            if hist_entry.get("workout_notes"):
-                st.markdown("#### 📝 Notes")
-                st.text_area("Workout Notes", hist_entry["workout_notes"], disabled=True)
+        history_browser(user)
 
 # ----- PAGE: Reports -----
 elif page == "📄 Reports":
+    pd = load_pandas()
     st.markdown("### 📄 Reports & Export")
     
     if len(data) == 0:
@@ -897,27 +1004,100 @@ elif page == "📄 Reports":
     else:
         report_type = st.selectbox("Report Type", ["Weekly Summary", "Monthly Overview", "Custom Range"])
         
-        if report_type == "Weekly Summary":
-            # Last 7 days report logic (existing functionality enhanced)
-            pass
+        if report_type in ("Weekly Summary", "Monthly Overview"):
+            # Read precomputed week/month aggregates instead of scanning every day
+            kind, period_label = ("weeks", "Week") if report_type == "Weekly Summary" else ("months", "Month")
+            periods = st.slider(f"{period_label}s to show", min_value=1, max_value=52, value=12)
+            rows = []
+            for key, bucket in get_shared_diary(user=user).get_rollups().latest(kind, periods):
+                avg_cal = rollup_mean(bucket, "total_calories")
+                avg_protein = rollup_mean(bucket, "total_protein")
+                avg_steps = rollup_mean(bucket, "steps")
+                weight = bucket["metrics"]["weight"]
+                rows.append({
+                    period_label: key,
+                    "Days Logged": bucket["days"],
+                    "Avg Calories": round(avg_cal) if avg_cal is not None else None,
+                    "Avg Protein (g)": round(avg_protein, 1) if avg_protein is not None else None,
+                    "Avg Steps": round(avg_steps) if avg_steps is not None else None,
+                    "Net Calories": round(bucket["metrics"]["net_calories"]["sum"]),
+                    "Weight Min (kg)": weight["min"],
+                    "Weight Max (kg)": weight["max"],
+                    "All Goals Met": f"{bucket['goal_hits']['all']}/{bucket['days']}",
+                })
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        
+        # Exports cover the whole history unless a custom range is picked
+        export_start, export_end = None, None
+        if report_type == "Custom Range":
+            range_value = st.date_input(
+                "Date Range",
+                value=(datetime.strptime(date_index.dates[0], "%Y-%m-%d"), datetime.strptime(date_index.dates[-1], "%Y-%m-%d"))
+            )
+            if len(range_value) == 2:
+                export_start, export_end = (d.strftime("%Y-%m-%d") for d in range_value)
+        
+        def export_entries():
+            return get_shared_diary(user=user).iter_entries(export_start, export_end)
+        
+        export_table = st.selectbox(
+            "Table for CSV / Parquet",
+            list(EXPORT_TABLES),
+            format_func=lambda t: t.replace("_", " ").title()
+        )
+        file_stem = f"fittracker_{export_start or 'all'}_{export_end or 'time'}"
         
         # Add download buttons for different formats
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             if st.button("📊 Download Excel Report"):
-                # Create Excel export functionality
-                pass
+                try:
+                    excel_file = export_to_tempfile(write_excel, export_entries())
+                except ImportError:
+                    st.error("Excel export needs openpyxl: pip install openpyxl")
+                else:
+                    st.download_button(
+                        "⬇️ Save Excel", excel_file, file_name=f"{file_stem}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
         with col2:
+            # Weekly/monthly PDFs cover the last 7/30 days; custom uses the picked range
+            if report_type == "Custom Range":
+                pdf_start, pdf_end = export_start, export_end
+            else:
+                pdf_end = datetime.now()
+                pdf_start = (pdf_end - timedelta(days=7 if report_type == "Weekly Summary" else 30)).strftime("%Y-%m-%d")
+                pdf_end = pdf_end.strftime("%Y-%m-%d")
+            pdf_key = ("pdf", user, report_type, pdf_start, pdf_end, data_version)
+            runner = get_report_runner()
             if st.button("📄 Download PDF Report"):
-                # Enhanced PDF report
-                pass
+                runner.submit(pdf_key, build_pdf_report, report_type, list(get_shared_diary(user=user).iter_entries(pdf_start, pdf_end)))
+            pdf_job = runner.get(pdf_key)
+            if pdf_job is not None:
+                if not pdf_job.finished:
+                    show_report_progress(pdf_key)
+                elif pdf_job.error is not None:
+                    st.error(f"PDF report failed: {pdf_job.error}")
+                else:
+                    st.download_button(
+                        "⬇️ Save PDF", pdf_job.result, file_name=f"fittracker_{report_type.lower().replace(' ', '_')}.pdf",
+                        mime="application/pdf"
+                    )
         with col3:
             if st.button("📈 Download CSV Data"):
-                # CSV export functionality
-                pass
+                csv_file = export_to_tempfile(write_csv, export_table, export_entries())
+                st.download_button("⬇️ Save CSV", csv_file, file_name=f"{file_stem}_{export_table}.csv", mime="text/csv")
+        with col4:
+            if st.button("🗃️ Download Parquet"):
+                parquet_file = export_to_tempfile(write_parquet, export_table, export_entries())
+                st.download_button(
+                    "⬇️ Save Parquet", parquet_file, file_name=f"{file_stem}_{export_table}.parquet",
+                    mime="application/vnd.apache.parquet"
+                )
 
 # ----- PAGE: Settings -----
 elif page == "⚙️ Settings":
+    pd = load_pandas()
     st.markdown("### ⚙️ Settings & Preferences")
     
     col1, col2 = st.columns(2)
@@ -931,6 +1111,42 @@ elif page == "⚙️ Settings":
         new_cal_goal = st.number_input("Daily Calorie Goal", min_value=1000, max_value=5000, value=current_goals["calories"]["optimal"])
         new_protein_goal = st.number_input("Daily Protein Goal (g)", min_value=50, max_value=300, value=current_goals["protein"]["optimal"])
         new_steps_goal = st.number_input("Daily Steps Goal", min_value=5000, max_value=25000, value=current_goals["steps"]["optimal"])
+        
+        st.markdown("#### 📈 Charts")
+        st.session_state.plot_point_budget = st.number_input(
+            "Max points per chart line",
+            min_value=50,
+            max_value=5000,
+            step=50,
+            value=st.session_state.get("plot_point_budget", PLOT_POINT_BUDGET),
+            help="Longer ranges are downsampled (LTTB) to this many points to keep charts fast"
+        )
+        
+        st.markdown("#### ⏱️ Performance")
+        PROFILER.enabled = st.toggle(
+            "Record rerun timings",
+            value=PROFILER.enabled,
+            help="Times each page section and storage/compute call for every rerun in this server process"
+        )
+        timings = PROFILER.summary()
+        if timings:
+            st.dataframe(
+                pd.DataFrame(timings).drop(columns="histogram").round(2),
+                use_container_width=True,
+                hide_index=True
+            )
+            section = st.selectbox("Latency histogram", [row["section"] for row in timings])
+            histogram = next(row["histogram"] for row in timings if row["section"] == section)
+            st.bar_chart(pd.Series(histogram, name="reruns"))
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.download_button("⬇️ Export Timings (JSON)", PROFILER.to_json(), file_name="fittracker_timings.json", mime="application/json")
+            with col_b:
+                if st.button("🧹 Reset Timings"):
+                    PROFILER.reset()
+                    st.rerun()
+        elif PROFILER.enabled:
+            st.info("Timings will appear after the next rerun.")
     
     with col2:
         st.markdown("#### 🔐 Security")
@@ -939,13 +1155,68 @@ elif page == "⚙️ Settings":
         
         st.markdown("#### 📱 Data Management")
         if st.button("📤 Export All Data"):
-            st.info("Feature coming soon!")
-        
+            zip_file = export_to_tempfile(write_all_csv_zip, get_shared_diary(user=user).iter_entries())
+            st.download_button("⬇️ Save Export (.zip)", zip_file, file_name="fittracker_export.zip", mime="application/zip")
+
+        st.markdown("#### 📥 Bulk Import")
+        steps_upload = st.file_uploader("Steps export (CSV: date or timestamp, steps)", type="csv", key="import_steps")
+        food_upload = st.file_uploader("Food log (CSV: date, food, optional quantity)", type="csv", key="import_food")
+        if st.button("📥 Import", disabled=not (steps_upload or food_upload)):
+            from fittracker.importer import import_exports  # pulls in the food catalog; only needed here
+            progress = st.progress(0.0, text="Reading exports...")
+            try:
+                report = import_exports(
+                    steps=steps_upload, food=food_upload, user=user,
+                    progress=lambda r: progress.progress(0.5 if not r.days else 1.0, text=f"{r.rows:,} rows read, {r.days:,} days saved")
+                )
+            except ValueError as e:
+                st.markdown(f'<div class="warning-box">❌ {e}</div>', unsafe_allow_html=True)
+            except ConflictError:
+                # Importing is idempotent, so running it again just finishes the job
+                st.markdown('<div class="warning-box">⚠️ The diary kept changing while importing (another tab or device was saving). Days already imported were kept; please run the import again.</div>', unsafe_allow_html=True)
+            else:
+                progress.progress(1.0, text="Done")
+                st.markdown(f'<div class="success-box">✅ Imported {report.summary()}</div>', unsafe_allow_html=True)
+                for name, count in report.unmatched.most_common(10):
+                    st.caption(f"Unknown food '{name}' ({count} rows) was skipped")
+
+        st.markdown("#### 🔁 Recompute Totals")
+        st.caption("Re-derive every saved day's totals after food macros or step constants change")
+        runner = get_report_runner()
+        if st.button("🔁 Recompute History"):
+            from fittracker.recompute import recompute_history
+            # Keyed on the data version it started from; the key is kept because the job's own saves move the version
+            st.session_state.recompute_key = ("recompute", user, data_version)
+            runner.submit(st.session_state.recompute_key, recompute_history, user)
+        recompute_job = runner.get(st.session_state.get("recompute_key"))
+        if recompute_job is not None:
+            if not recompute_job.finished:
+                show_report_progress(st.session_state.recompute_key)
+            elif recompute_job.error is not None:
+                st.error(f"Recompute failed: {recompute_job.error}")
+            else:
+                report = recompute_job.result
+                st.markdown(f'<div class="success-box">✅ {report.summary()}</div>', unsafe_allow_html=True)
+                if report.changed:
+                    st.dataframe(
+                        pd.DataFrame([
+                            {"date": d, "field": field, "stored": old, "recomputed": new}
+                            for d, diff in sorted(report.changed.items()) for field, (old, new) in diff.items()
+                        ]),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
         if st.button("🗑️ Clear All Data", type="secondary"):
             st.info("Feature coming soon!")
 
+page_span.end()
+
 # Logout button
 st.sidebar.markdown("---")
+st.sidebar.caption(f"Signed in as **{user}**")
 if st.sidebar.button("🚪 Logout"):
-    st.session_state.authenticated = False
-    st.rerun()
\ No newline at end of file
+    switch_user(None)
+    st.rerun()
+
+rerun_span.end()
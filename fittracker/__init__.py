@@ -0,0 +1,48 @@
+"""FitTracker core: storage, nutrition math and rollups, usable without Streamlit.
+
+The package root only pulls in the standard library. Charts (plotly), the
+NumPy batch helpers, exports and PDF reports live in their own submodules
+and are imported from there.
+"""
+
+from .accounts import AccountStore, get_accounts
+from .nutrition import (
+    CAL_PER_MILE,
+    EXERCISE_DATA,
+    FOOD_DATA,
+    GOAL_THRESHOLD,
+    MAX_DAILY_STEPS,
+    MAX_FOOD_QUANTITY,
+    STEPS_PER_MILE,
+    WORKOUT_CALORIES,
+    calculate_bmi,
+    calculate_macros,
+    compute_entry_totals,
+    food_info,
+    get_bmi_category,
+    get_daily_goals,
+    goal_thresholds,
+    goals_met,
+    steps_to_miles_calories,
+)
+from .records import DayEntry, RecordError, load_records, new_entry
+from .perf import PROFILER, Profiler, get_profiler, profiled
+from .rollups import ROLLUP_METRICS, RollupStore, month_key, rollup_mean, week_key
+from .storage import (
+    HISTORY_PAGE_SIZE,
+    HISTORY_SORT_FIELDS,
+    ConflictError,
+    DateIndex,
+    JournalStore,
+    SharedDiary,
+    SQLiteStore,
+    claim_legacy_diary,
+    entry_version,
+    get_shared_diary,
+    get_store,
+    load_data,
+    migrate_json_to_sqlite,
+    partition_paths,
+    save_data,
+    save_entry,
+)
@@ -0,0 +1,137 @@
+"""User accounts: salted PBKDF2 password hashes kept in one small JSON file.
+
+Accounts only decide who is signed in; each user's diary lives in its own
+storage partition (see storage.partition_paths).
+"""
+
+import functools
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import threading
+from datetime import datetime
+
+from .storage import FileLock, claim_legacy_diary
+
+USERS_FILE = os.environ.get("FITTRACKER_USERS_FILE", "fitness_users.json")
+PBKDF2_ITERATIONS = 240_000
+MIN_PASSWORD_LENGTH = 8
+# Usernames double as partition directory names, so keep them path-safe
+USERNAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{2,31}$")
+
+def normalize_username(username):
+    return (username or "").strip().lower()
+
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
+    """A storable record {"salt", "hash", "iterations"} for password."""
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return {"salt": salt.hex(), "hash": digest.hex(), "iterations": iterations}
+
+def check_password(password, record):
+    expected = hash_password(password, bytes.fromhex(record["salt"]), record["iterations"])["hash"]
+    return hmac.compare_digest(expected, record["hash"])
+
+@functools.lru_cache(maxsize=1)
+def _dummy_record():
+    """Checked when the username doesn't exist, so a wrong username takes as
+    long to reject as a wrong password."""
+    return hash_password(secrets.token_hex(16))
+
+class AccountStore:
+    """username -> credential record, cached in memory until the file changes."""
+
+    def __init__(self, users_file=USERS_FILE):
+        self.users_file = users_file
+        self.lock = threading.Lock()
+        # Serializes sign-ups across processes (app workers, the API) sharing users_file
+        self.write_lock = FileLock(users_file + ".lock")
+        self._users = {}
+        self._stamp = None
+
+    def _stat(self):
+        try:
+            st_ = os.stat(self.users_file)
+            return (st_.st_mtime_ns, st_.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        stamp = self._stat()
+        if stamp != self._stamp:
+            if stamp is None:
+                self._users = {}
+            else:
+                with open(self.users_file, "r") as f:
+                    self._users = json.load(f)
+            self._stamp = stamp
+        return self._users
+
+    def _write(self, users):
+        tmp_path = f"{self.users_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(users, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.users_file)
+        self._users = users
+        self._stamp = self._stat()
+
+    def __len__(self):
+        with self.lock:
+            return len(self._load())
+
+    def __contains__(self, username):
+        with self.lock:
+            return normalize_username(username) in self._load()
+
+    def create(self, username, password, claim_legacy=False):
+        """Register a new account; returns the normalized username.
+
+        Raises ValueError for a taken or malformed username or a short password.
+        With claim_legacy, the very first account also takes over the diary
+        kept before accounts existed (storage.claim_legacy_diary). "First" is
+        decided and the files are moved under the cross-process lock, so two
+        sign-ups racing for it can't split the legacy files between them.
+        """
+        username = normalize_username(username)
+        if not USERNAME_PATTERN.match(username):
+            raise ValueError("Usernames are 3-32 characters: letters, digits, '_' or '-'.")
+        if len(password or "") < MIN_PASSWORD_LENGTH:
+            raise ValueError(f"Passwords need at least {MIN_PASSWORD_LENGTH} characters.")
+        record = hash_password(password)
+        record["created"] = datetime.now().isoformat(timespec="seconds")
+        with self.write_lock, self.lock:
+            self._stamp = None  # re-read under the lock: another process may have just added someone
+            users = dict(self._load())
+            if username in users:
+                raise ValueError(f"The username '{username}' is already taken.")
+            if claim_legacy and not users:
+                claim_legacy_diary(username)
+            users[username] = record
+            self._write(users)
+        return username
+
+    def verify(self, username, password):
+        """The normalized username if the password matches, else None."""
+        username = normalize_username(username)
+        with self.lock:
+            record = self._load().get(username)
+        if record is None:
+            check_password(password or "", _dummy_record())
+            return None
+        return username if check_password(password or "", record) else None
+
+_accounts = None
+_accounts_lock = threading.Lock()
+
+def get_accounts():
+    """The process-wide account store."""
+    global _accounts
+    with _accounts_lock:
+        if _accounts is None:
+            _accounts = AccountStore()
+        return _accounts
@@ -0,0 +1,317 @@
+"""Local HTTP/JSON API for logging steps, foods and workouts without the app.
+
+    python -m fittracker.api [--host 127.0.0.1] [--port 8765]
+
+Every request authenticates with HTTP Basic auth against the app's
+accounts and writes to that account's diary partition. Endpoints (dates
+are YYYY-MM-DD):
+
+    GET  /v1/health
+    GET  /v1/entries/<date>
+    POST /v1/entries/<date>/steps      {"steps": 8200, "mode": "set" | "add"}
+    POST /v1/entries/<date>/foods      {"foods": {"Oats": 60}, "mode": "set" | "add"}
+    POST /v1/entries/<date>/exercises  {"exercises": [{"type": "Legs", "intensity": 2}]}
+
+Updates are applied to the stored entry the same way the Daily Entry save
+does (raw fields, then compute_entry_totals) and the response is the saved
+entry with its new version. Steps and food quantities are held to the
+Daily Entry form's limits (MAX_DAILY_STEPS a day, MAX_FOOD_QUANTITY of a
+food a day), including after "add" updates accumulate; an update that
+would go past them gets a 400 and changes nothing. The server runs on asyncio with keep-alive
+connections. Writes are group-committed: each account has one writer task
+that takes every update queued while its previous save was running,
+merges them per day and saves them in one locked upsert, so thousands of
+small updates a second cost a handful of journal appends.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import re
+from datetime import date
+from http import HTTPStatus
+
+from .accounts import get_accounts
+from .nutrition import MAX_DAILY_STEPS, MAX_FOOD_QUANTITY, WORKOUT_CALORIES, compute_entry_totals, food_info
+from .records import RecordError, new_entry
+from .storage import ConflictError, get_shared_diary
+
+API_HOST = "127.0.0.1"  # local only; put a TLS proxy in front before exposing it
+API_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024
+INGEST_MAX_BATCH = 2_000  # updates per group commit
+INGEST_RETRIES = 3
+AUTH_CACHE_SIZE = 1_024
+
+_ENTRY_PATH = re.compile(r"^/v1/entries/(\d{4}-\d{2}-\d{2})(?:/(steps|foods|exercises))?$")
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _parse_date(date_str):
+    try:
+        date.fromisoformat(date_str)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid date '{date_str}'")
+    return date_str
+
+def _number(value, what, limit):
+    # json.loads accepts NaN and Infinity, which would poison the day's totals
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or not 0 <= value <= limit:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{what} must be a number from 0 to {limit:,g}")
+    return value
+
+def _check_limit(value, what, limit):
+    """A merged day's value must still fit the Daily Entry form."""
+    if value > limit:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{what} would reach {value:,g}, over the daily limit of {limit:,g}")
+
+def parse_update(kind, body):
+    """Validate a POST body; returns the normalized update payload."""
+    if not isinstance(body, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+    mode = body.get("mode", "set")
+    if kind == "steps":
+        if mode not in ("set", "add"):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "mode must be 'set' or 'add'")
+        return {"steps": int(_number(body.get("steps"), "steps", MAX_DAILY_STEPS)), "mode": mode}
+    if kind == "foods":
+        foods = body.get("foods")
+        if mode not in ("set", "add") or not isinstance(foods, dict) or not foods:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "foods must be a non-empty {name: quantity} object; mode 'set' or 'add'")
+        unknown = [name for name in foods if food_info(name) is None]
+        if unknown:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown foods: {', '.join(unknown)}")
+        return {"foods": {name: float(_number(qty, name, MAX_FOOD_QUANTITY)) for name, qty in foods.items()}, "mode": mode}
+    exercises = body.get("exercises")
+    if not isinstance(exercises, list) or not exercises:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "exercises must be a non-empty list")
+    parsed = []
+    for exercise in exercises:
+        intensity = exercise.get("intensity", 1) if isinstance(exercise, dict) else None
+        if intensity not in WORKOUT_CALORIES:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "each exercise needs an intensity of 1, 2 or 3")
+        parsed.append({"type": str(exercise.get("type", "")), "intensity": intensity, "calories": WORKOUT_CALORIES[intensity]})
+    return {"exercises": parsed}
+
+def apply_update(entry, kind, update):
+    """Apply one parsed update to an entry's raw fields in place.
+
+    Raises ApiError if the merged steps or a food's quantity goes past its
+    daily limit; the caller then saves nothing from that update.
+    """
+    if kind == "steps":
+        previous = (entry.get("steps") or 0) if update["mode"] == "add" else 0
+        entry["steps"] = previous + update["steps"]
+        _check_limit(entry["steps"], "steps", MAX_DAILY_STEPS)
+    elif kind == "foods":
+        food = entry.setdefault("food", {})
+        for name, qty in update["foods"].items():
+            food[name] = round(qty + (food.get(name, 0.0) if update["mode"] == "add" else 0.0), 1)
+            _check_limit(food[name], name, MAX_FOOD_QUANTITY)
+    else:
+        entry.setdefault("exercises", []).extend(update["exercises"])
+
+def save_updates(user, updates):
+    """Apply [(date, kind, update)] in order and save every touched day in one batch; returns {date: entry}.
+
+    Runs off the event loop. Updates are re-applied to freshly read days if
+    another writer (the app, the importer) saved one of them first.
+    """
+    diary = get_shared_diary(user=user)
+    for attempt in range(INGEST_RETRIES):
+        current = diary.get()
+        entries = {}
+        for date_str, kind, update in updates:
+            entry = entries.get(date_str)
+            if entry is None:
+                stored = current.get(date_str)
+                entry = entries[date_str] = stored.to_dict() if stored else new_entry(date_str)
+            apply_update(entry, kind, update)
+        for entry in entries.values():
+            entry.update(compute_entry_totals(entry))
+        try:
+            return diary.save_entries(entries.items())
+        except ConflictError:
+            if attempt == INGEST_RETRIES - 1:
+                raise
+
+class IngestServer:
+    """The asyncio HTTP server and its per-account write queues."""
+
+    def __init__(self, accounts=None, max_batch=INGEST_MAX_BATCH):
+        self.accounts = accounts or get_accounts()
+        self.max_batch = max_batch
+        self.queues = {}  # user -> asyncio.Queue of (date, kind, update, future)
+        self.writers = {}
+        self._verified = {}  # sha256 of an Authorization header -> username
+        self.batches = 0
+        self.updates = 0
+
+    async def _authenticate(self, header):
+        if not header or not header.startswith("Basic "):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Basic auth required")
+        # Password hashing is deliberately slow, so a verified header is remembered (by digest only)
+        digest = hashlib.sha256(header.encode("latin-1")).digest()
+        user = self._verified.get(digest)
+        if user is None:
+            try:
+                username, _, password = base64.b64decode(header[6:]).decode("utf-8").partition(":")
+            except ValueError:
+                raise ApiError(HTTPStatus.UNAUTHORIZED, "Malformed credentials")
+            user = await asyncio.to_thread(self.accounts.verify, username, password)
+            if user is None:
+                raise ApiError(HTTPStatus.UNAUTHORIZED, "Incorrect username or password")
+            if len(self._verified) >= AUTH_CACHE_SIZE:
+                self._verified.clear()
+            self._verified[digest] = user
+        return user
+
+    async def _writer(self, user, queue):
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                saved = await asyncio.to_thread(save_updates, user, [(d, kind, update) for d, kind, update, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    if not batch[0][3].done():
+                        batch[0][3].set_exception(e)
+                    continue
+                # One bad update mustn't fail everyone else's: save them one at a time so only it errors
+                for date_str, kind, update, future in batch:
+                    try:
+                        saved = await asyncio.to_thread(save_updates, user, [(date_str, kind, update)])
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        self.batches += 1
+                        self.updates += 1
+                        if not future.done():
+                            future.set_result(saved[date_str])
+            else:
+                self.batches += 1
+                self.updates += len(batch)
+                for date_str, *_, future in batch:
+                    if not future.done():
+                        future.set_result(saved[date_str])
+
+    async def submit(self, user, date_str, kind, update):
+        """Queue an update for user's writer; resolves to the saved entry."""
+        queue = self.queues.get(user)
+        if queue is None:
+            queue = self.queues[user] = asyncio.Queue()
+            self.writers[user] = asyncio.create_task(self._writer(user, queue))
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((date_str, kind, update, future))
+        return await future
+
+    async def route(self, method, path, headers, body):
+        """(status, JSON-able payload) for one request."""
+        if path == "/v1/health":
+            return HTTPStatus.OK, {"status": "ok", "batches": self.batches, "updates": self.updates}
+        match = _ENTRY_PATH.match(path)
+        if match is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+        user = await self._authenticate(headers.get("authorization"))
+        date_str, kind = _parse_date(match.group(1)), match.group(2)
+        if kind is None:
+            if method != "GET":
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+            entry = get_shared_diary(user=user).get().get(date_str)
+            if entry is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"Nothing logged on {date_str}")
+            return HTTPStatus.OK, entry.to_dict()
+        if method != "POST":
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON")
+        update = parse_update(kind, payload)
+        return HTTPStatus.OK, (await self.submit(user, date_str, kind, update)).to_dict()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                length = headers.get("content-length") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    # The body's end is unknown, so the connection can't be reused
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, payload = await self.route(method, target.split("?", 1)[0], headers, body)
+                except ApiError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except RecordError as e:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        extra = 'WWW-Authenticate: Basic realm="fittracker"\r\n' if status == HTTPStatus.UNAUTHORIZED else ""
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n{extra}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host=API_HOST, port=API_PORT, ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    # Printed once the socket is bound, so whoever waits for this line can connect straight away
+    ready = lambda server: print(f"Listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        asyncio.run(IngestServer().serve(args.host, args.port, ready=ready))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
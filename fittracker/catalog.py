@@ -0,0 +1,356 @@
+"""Searchable food catalog: FOOD_DATA plus an offline nutrient file.
+
+The source file is a CSV with a header row and the columns
+name,unit,base,cal,protein,fat and an optional meal (macros per `base` grams,
+or per piece when unit is "count"), so a nutrient database export can be
+converted once and dropped next to the diary.
+
+On first use the CSV is compiled into a binary columnar file (CATALOG_BIN):
+fixed-width nutrient columns, a string table of names and the prebuilt
+search indexes. Every later process memory-maps that file read-only, so
+startup parses nothing, lookups read straight out of the mapping, and the
+OS shares the pages between Streamlit workers. Searching never scans the
+whole catalog: a sorted word list answers prefix queries by bisection and a
+trigram index fills in fuzzy matches for typos.
+"""
+
+import bisect
+import csv
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+
+import numpy as np
+
+from .nutrition import FOOD_DATA
+from .perf import profiled
+
+CATALOG_FILE = os.environ.get("FITTRACKER_FOOD_CATALOG", "food_catalog.csv")
+CATALOG_BIN = os.environ.get("FITTRACKER_FOOD_CATALOG_BIN", "food_catalog.bin")
+CATALOG_COLUMNS = ("name", "unit", "base", "cal", "protein", "fat", "meal")
+SEARCH_LIMIT = 20
+FUZZY_MIN_SHARE = 0.5  # share of the query's trigrams a fuzzy match must contain
+
+UNITS = ("g", "count")
+MEALS = (None, "Meal 1", "Meal 2", "Meal 3")  # meal tag 0 means untagged
+
+# Binary layout: magic, header length (uint32), JSON header naming each
+# section's dtype, offset and length, then the sections, each 8-byte aligned.
+CATALOG_MAGIC = b"FTCATLG1"
+_SECTIONS = {
+    "unit": "u1", "meal": "u1", "base": "<f8", "cal": "<f8", "protein": "<f8", "fat": "<f8",
+    "name_offsets": "<u8", "name_blob": "u1", "name_order": "<u4",
+    "word_offsets": "<u8", "word_blob": "u1", "word_ids": "<u4", "word_first": "u1",
+    "key_lens": "<u2", "gram_counts": "<u2", "grams": "S3", "gram_offsets": "<u8", "gram_postings": "<u4",
+}
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+def normalize(text):
+    """Lowercase words separated by single spaces, punctuation dropped."""
+    return " ".join(_NON_WORD.split(text.lower())).strip()
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _smallest(values, k):
+    """Positions of the k smallest values, in ascending order."""
+    if len(values) > k:
+        positions = np.argpartition(values, k)[:k]
+    else:
+        positions = np.arange(len(values))
+    return positions[np.argsort(values[positions], kind="stable")]
+
+def _aligned(size):
+    return -(-size // 8) * 8
+
+def _string_table(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+class StringTable:
+    """Read-only sequence of strings packed into one byte blob plus offsets.
+
+    Supports len() and indexing, so bisect works on it directly when the
+    strings were written in sorted order.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes().decode("utf-8")
+
+class _Permuted:
+    """A sequence viewed through an index permutation (for bisecting names)."""
+
+    def __init__(self, seq, order):
+        self.seq = seq
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.seq[int(self.order[i])]
+
+def build_columns(foods):
+    """Compile (name, info) pairs into the catalog's column arrays."""
+    names, units, meals, macros, keys = [], [], [], [], []
+    seen = set()
+    for name, info in foods:
+        if name in seen:
+            continue  # first source wins, so FOOD_DATA entries are never shadowed
+        seen.add(name)
+        names.append(name)
+        units.append(UNITS.index(info["unit"]))
+        meals.append(MEALS.index(info.get("meal")) if info.get("meal") in MEALS else 0)
+        macros.append((info["base"], info["cal"], info["protein"], info["fat"]))
+        keys.append(normalize(name))
+
+    columns = {
+        "unit": np.array(units, dtype=np.uint8),
+        "meal": np.array(meals, dtype=np.uint8),
+    }
+    macros = np.array(macros, dtype=np.float64).reshape(-1, 4)
+    for i, column in enumerate(("base", "cal", "protein", "fat")):
+        columns[column] = np.ascontiguousarray(macros[:, i])
+    columns["name_offsets"], columns["name_blob"] = _string_table(names)
+    columns["name_order"] = np.array(sorted(range(len(names)), key=names.__getitem__), dtype=np.uint32)
+
+    words = sorted((word, food_id, pos == 0) for food_id, key in enumerate(keys) for pos, word in enumerate(key.split()))
+    columns["word_offsets"], columns["word_blob"] = _string_table([word for word, _, _ in words])
+    columns["word_ids"] = np.array([food_id for _, food_id, _ in words], dtype=np.uint32)
+    columns["word_first"] = np.array([first for _, _, first in words], dtype=np.uint8)
+    del words
+
+    postings = {}
+    gram_counts = np.zeros(len(keys), dtype=np.uint16)
+    for food_id, key in enumerate(keys):
+        key_grams = trigrams(key)
+        gram_counts[food_id] = min(len(key_grams), 0xFFFF)
+        for gram in key_grams:
+            postings.setdefault(gram, []).append(food_id)
+    grams = sorted(postings)
+    columns["key_lens"] = np.array([min(len(key), 0xFFFF) for key in keys], dtype=np.uint16)
+    columns["gram_counts"] = gram_counts
+    columns["grams"] = np.array([g.encode("ascii") for g in grams], dtype="S3")
+    columns["gram_offsets"] = np.zeros(len(grams) + 1, dtype=np.uint64)
+    np.cumsum([len(postings[g]) for g in grams], out=columns["gram_offsets"][1:])
+    columns["gram_postings"] = np.array([i for g in grams for i in postings[g]], dtype=np.uint32)
+    return columns
+
+def food_data_signature():
+    """Changes whenever FOOD_DATA does, so a stale compiled catalog gets rebuilt."""
+    return hashlib.sha1(json.dumps(FOOD_DATA, sort_keys=True).encode()).hexdigest()
+
+def write_catalog_bin(columns, path):
+    """Write column arrays to `path` atomically (temp file, then rename)."""
+    header = {"food_data": food_data_signature(), "sections": {}}
+    offset = 0
+    for name, dtype in _SECTIONS.items():
+        header["sections"][name] = [dtype, offset, len(columns[name])]
+        offset += _aligned(np.dtype(dtype).itemsize * len(columns[name]))
+    header_bytes = json.dumps(header).encode()
+    data_start = _aligned(len(CATALOG_MAGIC) + 4 + len(header_bytes))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CATALOG_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        for name, (dtype, section_offset, _) in header["sections"].items():
+            f.seek(data_start + section_offset)
+            f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_catalog_header(path):
+    """(header dict, offset of the first section) for a compiled catalog."""
+    with open(path, "rb") as f:
+        if f.read(len(CATALOG_MAGIC)) != CATALOG_MAGIC:
+            raise ValueError(f"{path} is not a compiled food catalog")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        return json.loads(f.read(header_len)), _aligned(len(CATALOG_MAGIC) + 4 + header_len)
+
+def map_catalog_bin(path):
+    """Column arrays viewing a read-only memory map of `path` (nothing is copied)."""
+    header, data_start = read_catalog_header(path)
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return {
+        name: np.frombuffer(mapping, dtype=dtype, count=count, offset=data_start + offset)
+        for name, (dtype, offset, count) in header["sections"].items()
+    }
+
+class FoodCatalog:
+    """Foods by name with prefix and trigram search, over flat column arrays.
+
+    Foods are numbered in load order. Nutrients are fixed-width columns,
+    names and index words are string tables, and the trigram posting lists
+    are stored back to back (CSR style) behind a sorted trigram array. The
+    arrays may live in memory or be views of a memory-mapped catalog file.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.names = StringTable(columns["name_offsets"], columns["name_blob"])
+        self._sorted_names = _Permuted(self.names, columns["name_order"])
+        self._words = StringTable(columns["word_offsets"], columns["word_blob"])
+
+    @classmethod
+    def from_foods(cls, foods):
+        return cls(build_columns(foods))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return self.food_id(name) is not None
+
+    def food_id(self, name):
+        pos = bisect.bisect_left(self._sorted_names, name)
+        if pos < len(self._sorted_names) and self._sorted_names[pos] == name:
+            return int(self.columns["name_order"][pos])
+        return None
+
+    def info(self, food_id):
+        """A FOOD_DATA-shaped dict for one food, read from the columns."""
+        columns = self.columns
+        info = {
+            "unit": UNITS[columns["unit"][food_id]],
+            "base": float(columns["base"][food_id]),
+            "cal": float(columns["cal"][food_id]),
+            "protein": float(columns["protein"][food_id]),
+            "fat": float(columns["fat"][food_id]),
+        }
+        meal = MEALS[columns["meal"][food_id]]
+        if meal:
+            info["meal"] = meal
+        return info
+
+    def get(self, name, default=None):
+        food_id = self.food_id(name)
+        return default if food_id is None else self.info(food_id)
+
+    @profiled("catalog.search")
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Up to `limit` food names for a partially typed query, best first.
+
+        Names with a word starting with each query word come first, those
+        whose first word matches the query's first word ahead of the rest and
+        shorter names ahead of longer ones. Trigram matches fill any remaining
+        slots, so "chiken" still finds "Chicken".
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        columns = self.columns
+        hits = leading = None
+        for token in key.split():
+            lo = bisect.bisect_left(self._words, token)
+            hi = bisect.bisect_left(self._words, token + "\x7f")
+            ids = columns["word_ids"][lo:hi]
+            if leading is None:
+                leading = ids[columns["word_first"][lo:hi].astype(bool)]
+            ids = np.unique(ids)
+            hits = ids if hits is None else np.intersect1d(hits, ids, assume_unique=True)
+            if not hits.size:
+                break
+        rank = columns["key_lens"][hits].astype(np.int64) + np.where(np.isin(hits, leading), 0, 1 << 16)
+        ranked = hits[_smallest(rank, limit)].tolist()
+
+        if len(ranked) < limit and len(key) >= 3:
+            query_grams = trigrams(key)
+            grams, offsets = columns["grams"], columns["gram_offsets"]
+            wanted = np.array([g.encode("ascii") for g in query_grams], dtype="S3")
+            pos = np.searchsorted(grams, wanted)
+            found = pos[(pos < len(grams)) & (grams[np.minimum(pos, len(grams) - 1)] == wanted)]
+            if found.size:
+                postings = np.concatenate([columns["gram_postings"][offsets[p]:offsets[p + 1]] for p in found])
+                shared = np.bincount(postings, minlength=len(self))
+                shared[ranked] = 0
+                candidates = np.flatnonzero(shared >= FUZZY_MIN_SHARE * len(query_grams))
+                # Most shared trigrams first, then the names with the fewest trigrams (shortest)
+                rank = -shared[candidates].astype(np.int64) * (1 << 16) + columns["gram_counts"][candidates]
+                ranked += candidates[_smallest(rank, limit - len(ranked))].tolist()
+        return [self.names[i] for i in ranked]
+
+def read_catalog_file(path):
+    """(name, info) pairs from a catalog CSV; rows with bad numbers are skipped."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                info = {
+                    "unit": "count" if row["unit"].strip() == "count" else "g",
+                    "base": float(row["base"]),
+                    "cal": float(row["cal"]),
+                    "protein": float(row["protein"]),
+                    "fat": float(row["fat"]),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+            meal = (row.get("meal") or "").strip()
+            if meal in MEALS:
+                info["meal"] = meal
+            name = (row.get("name") or "").strip()
+            if name and info["base"] > 0:
+                yield name, info
+
+def compile_catalog(csv_path=None, bin_path=None):
+    """Compile FOOD_DATA plus the catalog CSV into the binary catalog file."""
+    csv_path = csv_path or CATALOG_FILE
+    bin_path = bin_path or CATALOG_BIN
+    foods = list(FOOD_DATA.items())
+    if os.path.exists(csv_path):
+        foods += read_catalog_file(csv_path)
+    write_catalog_bin(build_columns(foods), bin_path)
+    return bin_path
+
+def _bin_is_current(csv_path, bin_path):
+    if not os.path.exists(bin_path):
+        return False
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(bin_path):
+        return False
+    try:
+        header, _ = read_catalog_header(bin_path)
+    except (OSError, ValueError):
+        return False
+    return header.get("food_data") == food_data_signature()
+
+@profiled("catalog.load")
+def load_catalog(path=None, bin_path=None):
+    """Map the compiled catalog, compiling it first when the CSV is newer.
+
+    With neither a CSV nor a compiled file the catalog is just FOOD_DATA,
+    built in memory.
+    """
+    path = path or CATALOG_FILE
+    bin_path = bin_path or CATALOG_BIN
+    if not os.path.exists(path) and not os.path.exists(bin_path):
+        return FoodCatalog.from_foods(FOOD_DATA.items())
+    if not _bin_is_current(path, bin_path):
+        compile_catalog(path, bin_path)
+    return FoodCatalog(map_catalog_bin(bin_path))
+
+# One mapping per process; the OS shares its pages with every other process
+_catalogs = {}
+_catalog_lock = threading.Lock()
+
+def get_catalog(path=None):
+    path = path or CATALOG_FILE
+    with _catalog_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            catalog = _catalogs[path] = load_catalog(path)
+        return catalog
@@ -0,0 +1,159 @@
+"""Plotly figure builders for the Progress page (no Streamlit).
+
+plotly and NumPy are imported on first use, so importing this module for its
+constants costs nothing on pages that never draw a chart.
+"""
+
+from datetime import datetime
+
+from .perf import profiled
+
+PLOT_POINT_BUDGET = 365  # default max points per chart trace before downsampling
+
+def _trend_points(data, key, dates, max_points):
+    """x/y lists for one metric, LTTB-downsampled past max_points."""
+    values = [data[d].get(key, None) for d in dates]
+    
+    if max_points is not None and len(dates) > max_points:
+        # LTTB needs real numbers, so days missing this metric (e.g. no weigh-in) drop out
+        points = [(d, v) for d, v in zip(dates, values) if v is not None]
+        dates = [d for d, _ in points]
+        values = [v for _, v in points]
+        ordinals = [datetime.strptime(d, "%Y-%m-%d").toordinal() for d in dates]
+        from .downsample import lttb_downsample
+        keep = lttb_downsample(ordinals, values, max_points)
+        return [dates[i] for i in keep], [values[i] for i in keep], True
+    return dates, values, False
+
+@profiled("chart.plot_enhanced_trends")
+def plot_enhanced_trends(data, key, title, ylabel, color="#667eea", dates=None, max_points=None):
+    if dates is None:
+        dates = sorted(data.keys())
+    import plotly.graph_objs as go
+    
+    dates, values, downsampled = _trend_points(data, key, dates, max_points)
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=dates, 
+        y=values, 
+        mode='lines' if downsampled else 'lines+markers',
+        name=title,
+        line=dict(color=color, width=3),
+        marker=dict(size=8, color=color),
+        hovertemplate='<b>%{y}</b><br>%{x}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=dict(text=title, x=0.5, font=dict(size=18, color='#333')),
+        xaxis_title='Date',
+        yaxis_title=ylabel,
+        height=350,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Arial", size=12),
+        hovermode='x',
+        showlegend=False
+    )
+    
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+    
+    return fig
+
+@profiled("chart.plot_progress_overview")
+def plot_progress_overview(data, metrics, dates=None, max_points=None):
+    """All progress metrics stacked on one shared x-axis, sent as a single figure."""
+    import plotly.graph_objs as go
+    from plotly.subplots import make_subplots
+    
+    if dates is None:
+        dates = sorted(data.keys())
+    fig = make_subplots(
+        rows=len(metrics), cols=1, shared_xaxes=True, vertical_spacing=0.04,
+        subplot_titles=[title for title, _, _ in metrics.values()]
+    )
+    for row, (key, (title, ylabel, color)) in enumerate(metrics.items(), start=1):
+        x, y, downsampled = _trend_points(data, key, dates, max_points)
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y,
+            mode='lines' if downsampled else 'lines+markers',
+            name=title,
+            line=dict(color=color, width=2),
+            marker=dict(size=5, color=color),
+            hovertemplate='<b>%{y}</b><br>%{x}<extra></extra>'
+        ), row=row, col=1)
+        fig.update_yaxes(title_text=ylabel, row=row, col=1)
+    
+    fig.update_layout(
+        height=250 * len(metrics),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Arial", size=12),
+        hovermode='x',
+        showlegend=False
+    )
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+    return fig
+
+def _array_points(days, values, max_points):
+    """x/y arrays for one trends series without its NaN days, LTTB-downsampled past max_points."""
+    import numpy as np
+    known = ~np.isnan(values)
+    days, values = days[known], values[known]
+    if max_points is not None and len(days) > max_points:
+        from .downsample import lttb_downsample
+        keep = lttb_downsample(days.astype(np.int64), values, max_points)
+        days, values = days[keep], values[keep]
+    return days, values
+
+@profiled("chart.plot_weight_trend")
+def plot_weight_trend(trends, max_points=None):
+    """Weigh-ins with the smoothed trend, above the rolling TDEE estimate, from a trends.WeightTrends."""
+    import plotly.graph_objs as go
+    from plotly.subplots import make_subplots
+    
+    fig = make_subplots(
+        rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08, row_heights=[0.6, 0.4],
+        subplot_titles=["Weight & Trend (kg)", "Estimated Maintenance Calories (TDEE)"]
+    )
+    x, y = _array_points(trends.days, trends.weight, max_points)
+    fig.add_trace(go.Scatter(
+        x=x, y=y, mode='markers', name='Weigh-in',
+        marker=dict(size=5, color='rgba(231,76,60,0.35)'),
+        hovertemplate='<b>%{y:.1f} kg</b><br>%{x}<extra></extra>'
+    ), row=1, col=1)
+    x, y = _array_points(trends.days, trends.trend, max_points)
+    fig.add_trace(go.Scatter(
+        x=x, y=y, mode='lines', name='Trend',
+        line=dict(color='#e74c3c', width=3),
+        hovertemplate='<b>%{y:.2f} kg</b> trend<br>%{x}<extra></extra>'
+    ), row=1, col=1)
+    x, y = _array_points(trends.days, trends.tdee, max_points)
+    fig.add_trace(go.Scatter(
+        x=x, y=y, mode='lines', name='TDEE',
+        line=dict(color='#667eea', width=2),
+        hovertemplate='<b>%{y:.0f} kcal</b><br>%{x}<extra></extra>'
+    ), row=2, col=1)
+    
+    fig.update_layout(
+        height=550,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Arial", size=12),
+        hovermode='x',
+        showlegend=False
+    )
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128,128,128,0.2)')
+    return fig
+
+# Progress page metrics: key -> (title, y-axis label, color)
+PROGRESS_METRICS = {
+    "weight": ("Weight Progress (kg)", "Weight (kg)", "#e74c3c"),
+    "total_calories": ("Calorie Intake Trend", "Calories", "#f39c12"),
+    "total_protein": ("Protein Intake Trend", "Protein (g)", "#2ecc71"),
+    "steps": ("Daily Steps Trend", "Steps", "#3498db"),
+}
@@ -0,0 +1,31 @@
+"""Point-budget downsampling for long chart series."""
+
+import numpy as np
+
+def lttb_downsample(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points keeping the line's shape.
+
+    Always keeps the first and last point; each bucket in between contributes
+    the point forming the largest triangle with the previously kept point and
+    the next bucket's average.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(areas.argmax())
+        keep[i + 1] = a
+    return keep
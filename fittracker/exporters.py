@@ -0,0 +1,123 @@
+"""Streaming long-format exports (CSV, Excel, Parquet) of (date, entry) pairs."""
+
+import csv
+import io
+import shutil
+import tempfile
+import zipfile
+
+from .nutrition import food_info
+
+# Exports flatten each day into long-format tables. Rows are generated one day at
+# a time and written straight to the output file, so memory stays flat however
+# long the history is. Column types are used for the Parquet schema.
+EXPORT_TABLES = {
+    "daily": [
+        ("date", "string"), ("weight", "float64"), ("bmi", "float64"), ("steps", "int64"),
+        ("miles_walked", "float64"), ("is_gym_day", "bool"), ("total_calories", "float64"),
+        ("total_protein", "float64"), ("total_calories_burned", "float64"),
+        ("direct_calories", "float64"), ("net_calories", "float64"), ("workout_notes", "string"),
+    ],
+    "food": [("date", "string"), ("food", "string"), ("quantity", "float64"), ("unit", "string"), ("meal", "string")],
+    "exercises": [("date", "string"), ("type", "string"), ("intensity", "int64"), ("calories", "float64")],
+    "additional_meals": [("date", "string"), ("name", "string"), ("calories", "float64")],
+}
+EXPORT_BATCH_ROWS = 10000  # rows per Parquet row group
+
+def export_rows(table, date_str, entry):
+    """Rows (tuples in EXPORT_TABLES column order) one day contributes to a table."""
+    if table == "daily":
+        return [(date_str, *(entry.get(col) for col, _ in EXPORT_TABLES["daily"][1:]))]
+    if table == "food":
+        rows = []
+        for food, qty in entry.get("food", {}).items():
+            if qty:
+                info = food_info(food) or {}
+                rows.append((date_str, food, qty, info.get("unit"), info.get("meal")))
+        return rows
+    if table == "exercises":
+        return [(date_str, ex.get("type"), ex.get("intensity"), ex.get("calories")) for ex in entry.get("exercises", [])]
+    if table == "additional_meals":
+        return [(date_str, meal.get("name"), meal.get("calories")) for meal in entry.get("additional_meals", [])]
+    raise ValueError(f"Unknown export table: {table}")
+
+def write_csv(table, entries, fileobj):
+    """Stream one table as CSV into a binary file object."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    writer.writerow([col for col, _ in EXPORT_TABLES[table]])
+    for date_str, entry in entries:
+        writer.writerows(export_rows(table, date_str, entry))
+    text.detach()  # leave fileobj open for the caller
+
+def write_all_csv_zip(entries, fileobj):
+    """Every table as its own CSV inside one zip, from a single pass over the days."""
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        # zipfile only allows one open member for writing, so spool each table to a
+        # temp file during the pass and copy them in afterwards
+        spools = {table: tempfile.TemporaryFile() for table in EXPORT_TABLES}
+        try:
+            writers = {}
+            for table, spool in spools.items():
+                text = io.TextIOWrapper(spool, encoding="utf-8", newline="", write_through=True)
+                writers[table] = (text, csv.writer(text))
+                writers[table][1].writerow([col for col, _ in EXPORT_TABLES[table]])
+            for date_str, entry in entries:
+                for table, (_, writer) in writers.items():
+                    writer.writerows(export_rows(table, date_str, entry))
+            for table, (text, _) in writers.items():
+                text.detach()
+                spools[table].seek(0)
+                with zf.open(f"{table}.csv", "w") as member:
+                    shutil.copyfileobj(spools[table], member)
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+def write_excel(entries, fileobj):
+    """One sheet per table, using openpyxl's streaming write-only workbook."""
+    from openpyxl import Workbook  # optional dependency, only needed for Excel export
+    
+    workbook = Workbook(write_only=True)
+    sheets = {}
+    for table, columns in EXPORT_TABLES.items():
+        sheets[table] = workbook.create_sheet(title=table)
+        sheets[table].append([col for col, _ in columns])
+    for date_str, entry in entries:
+        for table, sheet in sheets.items():
+            for row in export_rows(table, date_str, entry):
+                sheet.append(row)
+    workbook.save(fileobj)
+
+def write_parquet(table, entries, fileobj):
+    """Stream one table as compressed, columnar Parquet, one row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    columns = EXPORT_TABLES[table]
+    schema = pa.schema([(col, pa.type_for_alias(type_name)) for col, type_name in columns])
+    batch = []
+    
+    def flush(writer):
+        if batch:
+            arrays = [list(values) for values in zip(*batch)]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(arrays, schema)], schema=schema
+            ))
+            batch.clear()
+    
+    with pq.ParquetWriter(fileobj, schema, compression="zstd") as writer:
+        for date_str, entry in entries:
+            batch.extend(export_rows(table, date_str, entry))
+            if len(batch) >= EXPORT_BATCH_ROWS:
+                flush(writer)
+        flush(writer)
+
+def export_to_tempfile(write, *args):
+    """Run an exporter into an unnamed temp file and return it rewound for download."""
+    out = tempfile.TemporaryFile()
+    write(*args, out)
+    out.flush()
+    out.seek(0)
+    # st.download_button accepts read-only buffered files, not read/write ones
+    return io.BufferedReader(out.detach())
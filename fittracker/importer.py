@@ -0,0 +1,295 @@
+"""Bulk import of pedometer and food-log CSV exports into a diary.
+
+    python -m fittracker.importer --steps steps.csv --food food_log.csv [--user NAME]
+
+Exports can run to millions of rows (a year of minute-level steps is over
+half a million), so files are read row by row and only per-day aggregates
+are kept: step counts summed per day and food quantities summed per
+(day, food). The days are then merged into the diary and written in
+batches of whole days, each batch one locked upsert, so memory grows with
+the number of days imported rather than the number of rows.
+
+Steps files need a date or timestamp column and a step count column; food
+logs need a date column and a food name column, with an optional quantity
+(grams, or pieces for count foods; one base serving when missing) or
+servings column. Food names are matched case-insensitively onto
+FOOD_DATA, then onto the food catalog; anything else is counted in the
+report and skipped. So are rows with a negative or non-finite amount, and
+rows that would take a day past what the Daily Entry form can show
+(MAX_DAILY_STEPS steps, MAX_FOOD_QUANTITY of one food), so an import can
+never leave a day the app can't open or a batch that fails validation
+halfway through.
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import math
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime
+
+from .catalog import get_catalog, normalize
+from .nutrition import FOOD_DATA, MAX_DAILY_STEPS, MAX_FOOD_QUANTITY, compute_entry_totals, food_info
+from .records import new_entry
+from .storage import ConflictError, get_shared_diary
+
+IMPORT_CHUNK_ROWS = 50_000  # rows between progress callbacks
+IMPORT_BATCH_DAYS = 366  # days per batched upsert
+IMPORT_RETRIES = 3  # re-merges of a batch whose days changed underneath it
+
+STEP_DATE_COLUMNS = ("date", "timestamp", "datetime", "time", "start_time", "start", "day")
+STEP_COUNT_COLUMNS = ("steps", "step_count", "count", "value")
+FOOD_DATE_COLUMNS = ("date", "day", "timestamp", "datetime", "time")
+FOOD_NAME_COLUMNS = ("food", "name", "item", "food_name", "description")
+FOOD_QUANTITY_COLUMNS = ("quantity", "qty", "amount", "grams", "servings")
+
+# Tried in order after the ISO fast path; the first that parses wins
+DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y", "%Y/%m/%d", "%Y%m%d")
+
+class ImportReport:
+    """What an import read, wrote and skipped, and how fast."""
+
+    def __init__(self):
+        self.step_rows = 0
+        self.food_rows = 0
+        self.skipped_rows = 0  # unparsable, negative or non-finite, or past the Daily Entry caps
+        self.days = 0
+        self.seconds = 0.0
+        self.unmatched = Counter()  # food name as written -> rows skipped
+
+    @property
+    def rows(self):
+        return self.step_rows + self.food_rows
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        text = (f"{self.rows:,} rows ({self.step_rows:,} steps, {self.food_rows:,} food) -> "
+                f"{self.days:,} days in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/sec)")
+        if self.skipped_rows:
+            text += f"; {self.skipped_rows:,} unreadable or out-of-range rows skipped"
+        if self.unmatched:
+            text += f"; {sum(self.unmatched.values()):,} rows of {len(self.unmatched)} unknown foods skipped"
+        return text
+
+def _open_text(source):
+    """A text stream over a path, a binary file (e.g. an upload) or a text file."""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "r", newline="", encoding="utf-8-sig")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+
+def _column(header, candidates, what, required=True):
+    positions = {name.strip().lower(): i for i, name in enumerate(header)}
+    for name in candidates:
+        if name in positions:
+            return positions[name]
+    if required:
+        raise ValueError(f"No {what} column found; expected one of: {', '.join(candidates)}.")
+    return None
+
+class _DayParser:
+    """Timestamp text -> "YYYY-MM-DD", cached per distinct date part."""
+
+    def __init__(self):
+        self._days = {}
+
+    def __call__(self, value):
+        value = value.strip()
+        # ISO dates and datetimes, by far the common case, need no parsing
+        if len(value) >= 10 and value[4] == "-" and value[7] == "-":
+            day = value[:10]
+            if day not in self._days:
+                date.fromisoformat(day)  # ValueError for e.g. 2024-13-45; the row is skipped
+                self._days[day] = day
+            return day
+        date_part = value.replace("T", " ").split(" ", 1)[0]
+        day = self._days.get(date_part)
+        if day is None:
+            for fmt in DATE_FORMATS:
+                try:
+                    day = datetime.strptime(date_part, fmt).date().isoformat()
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"Unrecognized date '{value}'")
+            self._days[date_part] = day
+        return day
+
+class _FoodMatcher:
+    """Exported food names -> FOOD_DATA or catalog names, cached per distinct name."""
+
+    def __init__(self):
+        self._known = {normalize(name): name for name in FOOD_DATA}
+        self._matches = {}
+        self._catalog = None
+
+    def __call__(self, raw):
+        if raw in self._matches:
+            return self._matches[raw]
+        key = normalize(raw)
+        match = self._known.get(key)
+        if match is None and key:
+            if self._catalog is None:
+                self._catalog = get_catalog()
+            if raw.strip() in self._catalog:
+                match = raw.strip()
+            else:
+                best = self._catalog.search(raw, limit=1)
+                if best and normalize(best[0]) == key:
+                    match = best[0]
+        self._matches[raw] = match
+        return match
+
+def _chunks(rows):
+    while True:
+        chunk = list(itertools.islice(rows, IMPORT_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+def read_step_totals(source, report, progress=None):
+    """Total steps per day from a steps export of any granularity."""
+    totals = {}
+    parse_day = _DayParser()
+    with _open_text(source) as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return {}
+        date_col = _column(header, STEP_DATE_COLUMNS, "date/timestamp")
+        steps_col = _column(header, STEP_COUNT_COLUMNS, "step count")
+        for chunk in _chunks(rows):
+            for row in chunk:
+                try:
+                    day = parse_day(row[date_col])
+                    steps = float(row[steps_col] or 0)
+                except (IndexError, ValueError):
+                    report.skipped_rows += 1
+                    continue
+                # A day the Daily Entry form couldn't show is refused row by row, before it's merged
+                total = totals.get(day, 0) + steps
+                if not (math.isfinite(steps) and steps >= 0 and total <= MAX_DAILY_STEPS):
+                    report.skipped_rows += 1
+                    continue
+                totals[day] = int(total)
+            report.step_rows += len(chunk)
+            if progress:
+                progress(report)
+    return dict(totals)
+
+def read_food_totals(source, report, progress=None):
+    """{day: {food: quantity}} from a food-log export, quantities summed per day."""
+    totals = defaultdict(lambda: defaultdict(float))
+    parse_day = _DayParser()
+    match_food = _FoodMatcher()
+    with _open_text(source) as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return {}
+        date_col = _column(header, FOOD_DATE_COLUMNS, "date")
+        name_col = _column(header, FOOD_NAME_COLUMNS, "food name")
+        qty_col = _column(header, FOOD_QUANTITY_COLUMNS, "quantity", required=False)
+        # A servings column counts base servings; the diary stores grams for gram foods
+        in_servings = qty_col is not None and header[qty_col].strip().lower() == "servings"
+        for chunk in _chunks(rows):
+            for row in chunk:
+                try:
+                    day = parse_day(row[date_col])
+                    food = match_food(row[name_col])
+                    quantity = float(row[qty_col] or 0) if qty_col is not None else None
+                except (IndexError, ValueError):
+                    report.skipped_rows += 1
+                    continue
+                if food is None:
+                    report.unmatched[row[name_col]] += 1
+                    continue
+                if quantity is None or in_servings:
+                    info = food_info(food)
+                    serving = info["base"] if info["unit"] == "g" else 1
+                    quantity = serving if quantity is None else quantity * serving
+                total = totals.get(day, {}).get(food, 0.0) + quantity
+                if not (math.isfinite(quantity) and quantity >= 0 and total <= MAX_FOOD_QUANTITY):
+                    report.skipped_rows += 1
+                    continue
+                totals[day][food] = total
+            report.food_rows += len(chunk)
+            if progress:
+                progress(report)
+    return {day: {food: round(qty, 1) for food, qty in foods.items()} for day, foods in totals.items()}
+
+def _merge(entry, date_str, steps, foods):
+    entry = entry.to_dict() if entry else new_entry(date_str)
+    if steps is not None:
+        entry["steps"] = steps
+    if foods:
+        entry["food"] = {**entry.get("food", {}), **foods}
+    entry.update(compute_entry_totals(entry))
+    return entry
+
+def _save_batch(diary, dates, step_totals, food_totals):
+    """Merge the imported days into what's stored and save them as one upsert.
+
+    Entries are merged on top of the latest stored days and saved with their
+    versions checked, so a day someone edits mid-import is re-merged rather
+    than overwritten.
+    """
+    for attempt in range(IMPORT_RETRIES):
+        current = diary.get()
+        items = [
+            (d, _merge(current.get(d), d, step_totals.get(d), food_totals.get(d)))
+            for d in dates
+        ]
+        try:
+            return diary.save_entries(items)
+        except ConflictError:
+            if attempt == IMPORT_RETRIES - 1:
+                raise
+
+def import_exports(steps=None, food=None, user=None, progress=None, batch_days=IMPORT_BATCH_DAYS):
+    """Import a steps export and/or a food-log export into user's diary.
+
+    Imported steps replace a day's step count; imported foods are added to
+    (or replace the quantity of the same food in) the day's food log.
+    Derived totals are recomputed for every touched day. progress, if
+    given, is called with the running ImportReport after each chunk of rows
+    and each saved batch. Returns the final ImportReport.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    step_totals = read_step_totals(steps, report, progress) if steps is not None else {}
+    food_totals = read_food_totals(food, report, progress) if food is not None else {}
+    diary = get_shared_diary(user=user)
+    days = sorted(set(step_totals) | set(food_totals))
+    for i in range(0, len(days), batch_days):
+        batch = days[i:i + batch_days]
+        _save_batch(diary, batch, step_totals, food_totals)
+        report.days += len(batch)
+        if progress:
+            progress(report)
+    report.seconds = time.perf_counter() - start
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", help="steps export CSV (date/timestamp and steps columns)")
+    parser.add_argument("--food", help="food-log CSV (date, food and optional quantity columns)")
+    parser.add_argument("--user", help="account whose diary to import into (default: the legacy diary)")
+    args = parser.parse_args()
+    if not (args.steps or args.food):
+        parser.error("give --steps and/or --food")
+    report = import_exports(steps=args.steps, food=args.food, user=args.user)
+    print(report.summary())
+    for name, count in report.unmatched.most_common(10):
+        print(f"  unknown food '{name}': {count} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Background report jobs on a thread pool, cached by key."""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class ReportJob:
+    def __init__(self):
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.future = None
+
+    def update(self, fraction, message):
+        self.progress = fraction
+        self.message = message
+
+    @property
+    def finished(self):
+        return self.future is not None and self.future.done()
+
+class ReportJobRunner:
+    """Runs report builds on a thread pool and keeps finished results.
+
+    Jobs are keyed on (report type, date range, data version), so asking for
+    an unchanged report again returns the cached job instead of rebuilding.
+    """
+
+    def __init__(self, max_workers=2, max_cached=16):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.max_cached = max_cached
+
+    def submit(self, key, build, *args):
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None and job.error is None:
+                self.jobs.move_to_end(key)
+                return job
+            job = ReportJob()
+            self.jobs[key] = job
+            while len(self.jobs) > self.max_cached:
+                self.jobs.popitem(last=False)
+            job.future = self.executor.submit(self._run, job, build, args)
+        return job
+
+    def _run(self, job, build, args):
+        job.update(0.0, "Starting")
+        try:
+            job.result = build(*args, progress=job.update)
+            job.update(1.0, "Done")
+        except Exception as e:
+            job.error = e
+            job.update(1.0, f"Failed: {e}")
+
+    def get(self, key):
+        with self.lock:
+            return self.jobs.get(key)
+
+_report_runner = None
+_report_runner_lock = threading.Lock()
+
+def get_report_runner():
+    """The process-wide runner, created on first use."""
+    global _report_runner
+    with _report_runner_lock:
+        if _report_runner is None:
+            _report_runner = ReportJobRunner()
+        return _report_runner
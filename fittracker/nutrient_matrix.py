@@ -0,0 +1,50 @@
+"""NumPy batch version of calculate_macros for whole histories."""
+
+import numpy as np
+
+from .nutrition import FOOD_DATA
+from .perf import profiled
+
+# Vectorized macros: FOOD_DATA compiled to a (foods x [cal, protein, fat]) matrix of
+# per-gram factors for "g" foods and per-unit factors for "count" foods, so a whole
+# history is one matrix product instead of a Python loop per day.
+MACRO_KEYS = ("cal", "protein", "fat")
+
+def build_nutrient_matrix(food_data=FOOD_DATA):
+    names = list(food_data)
+    matrix = np.zeros((len(names), len(MACRO_KEYS)))
+    for i, name in enumerate(names):
+        info = food_data[name]
+        if info["unit"] == "g":
+            divisor = info["base"]
+        elif info["unit"] == "count":
+            divisor = 1
+        else:
+            continue  # calculate_macros ignores unknown units too
+        matrix[i] = [info[key] / divisor for key in MACRO_KEYS]
+    return names, matrix
+
+NUTRIENT_FOODS, NUTRIENT_MATRIX = build_nutrient_matrix()
+NUTRIENT_INDEX = {name: i for i, name in enumerate(NUTRIENT_FOODS)}
+
+def food_quantity_matrix(food_dicts, index=NUTRIENT_INDEX):
+    """Stack per-day food dicts into a days x foods quantity matrix."""
+    quantities = np.zeros((len(food_dicts), len(index)))
+    for row, foods in enumerate(food_dicts):
+        for food, qty in foods.items():
+            col = index.get(food)
+            if col is not None and qty:
+                quantities[row, col] = qty
+    return quantities
+
+@profiled("compute.calculate_macros_batch")
+def calculate_macros_batch(quantities, matrix=NUTRIENT_MATRIX):
+    """Macros for every day at once from a days x foods quantity matrix.
+
+    Returns {"cal": array, "protein": array, "fat": array}, one value per day,
+    matching calculate_macros() for the same inputs. Only FOOD_DATA foods have
+    matrix columns; catalog foods are left out.
+    """
+    quantities = np.nan_to_num(np.asarray(quantities, dtype=float))
+    totals = quantities @ matrix
+    return {key: totals[:, i] for i, key in enumerate(MACRO_KEYS)}
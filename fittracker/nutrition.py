@@ -0,0 +1,157 @@
+"""Food/exercise tables, daily goals and the nutrition math behind every save."""
+
+from .perf import profiled
+
+# Enhanced Food Database organized by meals with correct values
+FOOD_DATA = {
+    # Meal 1 Foods
+    "Oats": {"unit": "g", "base": 45, "cal": 170, "protein": 10, "fat": 0, "meal": "Meal 1"},
+    "Whey Protein": {"unit": "g", "base": 33, "cal": 120, "protein": 25, "fat": 0, "meal": "Meal 1"},
+    "Skim Milk Powder": {"unit": "g", "base": 46, "cal": 160, "protein": 16, "fat": 0, "meal": "Meal 1"},
+    "PB Powder": {"unit": "g", "base": 16, "cal": 80, "protein": 7, "fat": 0, "meal": "Meal 1"},
+    "Nuts": {"unit": "g", "base": 15, "cal": 100, "protein": 2, "fat": 9, "meal": "Meal 1"},
+    
+    # Meal 2 Foods
+    "White Rice": {"unit": "g", "base": 150, "cal": 210, "protein": 5, "fat": 0.5, "meal": "Meal 2"},
+    "Tomato": {"unit": "count", "base": 1, "cal": 25, "protein": 0.5, "fat": 0, "meal": "Meal 2"},
+    "Onion": {"unit": "count", "base": 1, "cal": 25, "protein": 0.5, "fat": 0, "meal": "Meal 2"},
+    "Yogurt": {"unit": "g", "base": 170, "cal": 90, "protein": 18, "fat": 0, "meal": "Meal 2"},
+    "Tortilla": {"unit": "count", "base": 1, "cal": 70, "protein": 5, "fat": 2, "meal": "Meal 2"},
+    "Soya Chunks": {"unit": "g", "base": 50, "cal": 155, "protein": 27, "fat": 1, "meal": "Meal 2"},
+    
+    # Meal 3 Foods
+    "Whey Protein Shake": {"unit": "g", "base": 33, "cal": 120, "protein": 25, "fat": 0, "meal": "Meal 3"},
+}
+
+# Enhanced exercise data
+EXERCISE_DATA = {
+    "Chest": {"intensity_1": 100, "intensity_2": 150, "intensity_3": 200, "icon": "💪"},
+    "Back": {"intensity_1": 100, "intensity_2": 150, "intensity_3": 200, "icon": "🏋️"},
+    "Bicep": {"intensity_1": 80, "intensity_2": 120, "intensity_3": 160, "icon": "💪"},
+    "Tricep": {"intensity_1": 80, "intensity_2": 120, "intensity_3": 160, "icon": "💪"},
+    "Shoulder": {"intensity_1": 90, "intensity_2": 135, "intensity_3": 180, "icon": "🏋️"},
+    "Legs": {"intensity_1": 120, "intensity_2": 180, "intensity_3": 240, "icon": "🦵"},
+    "Cardio": {"intensity_1": 200, "intensity_2": 300, "intensity_3": 400, "icon": "🏃"},
+    "Full Body": {"intensity_1": 150, "intensity_2": 225, "intensity_3": 300, "icon": "💥"},
+}
+
+# Dynamic fitness goals based on workout day
+def get_daily_goals(is_gym_day=True):
+    if is_gym_day:
+        return {
+            "calories": {"min": 1300, "max": 1400, "optimal": 1350},
+            "protein": {"min": 140, "max": 145, "optimal": 142},
+            "water": {"min": 2000, "max": 4000, "optimal": 3000},
+            "steps": {"min": 8000, "max": 15000, "optimal": 10000},
+        }
+    else:
+        return {
+            "calories": {"min": 1100, "max": 1200, "optimal": 1150},
+            "protein": {"min": 100, "max": 120, "optimal": 110},
+            "water": {"min": 2000, "max": 4000, "optimal": 3000},
+            "steps": {"min": 8000, "max": 15000, "optimal": 10000},
+        }
+
+STEPS_PER_MILE = 1200
+CAL_PER_MILE = 100
+WORKOUT_CALORIES = {1: 100, 2: 150, 3: 200}  # calories burned by workout intensity (light, medium, heavy)
+MAX_DAILY_STEPS = 100_000  # the Daily Entry steps input's cap
+MAX_FOOD_QUANTITY = 1000.0  # grams or pieces of one food per day; the Daily Entry food inputs' cap
+
+def food_info(name):
+    """Nutrient info for a food: FOOD_DATA first, then the food catalog (None if unknown)."""
+    info = FOOD_DATA.get(name)
+    if info is None:
+        from .catalog import get_catalog  # only days logged from the catalog pay for loading it
+        info = get_catalog().get(name)
+    return info
+
+@profiled("compute.calculate_macros")
+def calculate_macros(food_inputs):
+    """Calculate total macros from food input dict."""
+    total = {"cal": 0, "protein": 0, "fat": 0}
+    
+    for food, qty in food_inputs.items():
+        if qty is None or qty == 0:
+            continue
+        info = food_info(food)
+        if not info:
+            continue
+            
+        if info["unit"] == "g":
+            ratio = qty / info["base"]
+            total["cal"] += info["cal"] * ratio
+            total["protein"] += info["protein"] * ratio
+            total["fat"] += info["fat"] * ratio
+        elif info["unit"] == "count":
+            total["cal"] += info["cal"] * qty
+            total["protein"] += info["protein"] * qty
+            total["fat"] += info["fat"] * qty
+    
+    return total
+
+def calculate_bmi(weight, height_cm):
+    if weight is None or height_cm is None or weight <= 0 or height_cm <= 0:
+        return None
+    height_m = height_cm / 100
+    bmi = weight / (height_m ** 2)
+    return round(bmi, 2)
+
+def get_bmi_category(bmi):
+    if bmi is None:
+        return "Unknown", "gray"
+    elif bmi < 18.5:
+        return "Underweight", "#3498db"
+    elif bmi < 25:
+        return "Normal", "#2ecc71"
+    elif bmi < 30:
+        return "Overweight", "#f39c12"
+    else:
+        return "Obese", "#e74c3c"
+
+def steps_to_miles_calories(steps):
+    miles = steps / STEPS_PER_MILE
+    cal_burned = miles * CAL_PER_MILE
+    return round(miles, 2), round(cal_burned, 1)
+
+DEFAULT_HEIGHT_CM = 181.0
+
+def compute_entry_totals(entry):
+    """The derived fields of a diary entry (totals, BMI, miles) from its raw inputs.
+
+    Shared by the Daily Entry save and anything else that writes entries, so
+    imported or recomputed days match hand-entered ones exactly.
+    """
+    macros = calculate_macros(entry.get("food", {}))
+    additional_cal = sum(item.get("calories", 0) for item in entry.get("additional_meals", []))
+    exercise_cal = sum(ex.get("calories", 0) for ex in entry.get("exercises", [])) + (entry.get("direct_calories") or 0)
+    
+    total_calories = macros["cal"] + additional_cal
+    miles, step_calories = steps_to_miles_calories(entry.get("steps") or 0)
+    total_calories_burned = step_calories + exercise_cal
+    return {
+        "bmi": calculate_bmi(entry.get("weight"), entry.get("height") or DEFAULT_HEIGHT_CM),
+        "total_calories": round(total_calories, 1),
+        "total_protein": round(macros["protein"], 1),
+        "total_calories_burned": round(total_calories_burned, 1),
+        "net_calories": round(total_calories - total_calories_burned, 1),
+        "miles_walked": miles,
+    }
+
+GOAL_THRESHOLD = 0.9  # a goal counts as hit at 90% of its optimal value
+
+def goal_thresholds(is_gym_day=True):
+    """The calories, protein and steps a gym or rest day must reach to count as hitting its goals."""
+    goals = get_daily_goals(is_gym_day)
+    return {key: goals[key]["optimal"] * GOAL_THRESHOLD for key in ("calories", "protein", "steps")}
+
+def goals_met(entry):
+    """Which daily goals an entry hits, using that day's gym/rest targets."""
+    targets = goal_thresholds(entry.get("is_gym_day", True))
+    hits = {
+        "calories": entry.get("total_calories", 0) >= targets["calories"],
+        "protein": entry.get("total_protein", 0) >= targets["protein"],
+        "steps": entry.get("steps", 0) >= targets["steps"],
+    }
+    hits["all"] = all(hits.values())
+    return hits
@@ -0,0 +1,123 @@
+"""PDF report rendering with fpdf."""
+
+from datetime import datetime
+
+from .charts import PROGRESS_METRICS
+from .perf import profiled
+from .rollups import _add_to_bucket, _empty_bucket, rollup_mean
+
+# PDF reports are laid out with fpdf's drawing primitives (no chart rasterizer
+# needed) on a background thread pool, so building one never blocks a rerun.
+PDF_CHART_POINTS = 120  # LTTB budget per chart line in the PDF
+
+def _pdf_text(text):
+    # Core PDF fonts only cover latin-1
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+def _hex_to_rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+def _pdf_line_chart(pdf, title, dates, values, x, y, w, h, color):
+    pdf.set_xy(x, y)
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(w, 5, _pdf_text(title))
+    points = [(d, v) for d, v in zip(dates, values) if v is not None]
+    top, height = y + 7, h - 14
+    pdf.set_draw_color(200, 200, 200)
+    pdf.rect(x, top, w, height)
+    if len(points) < 2:
+        pdf.set_xy(x, top + height / 2)
+        pdf.set_font("Arial", "", 8)
+        pdf.cell(w, 4, "Not enough data", align="C")
+        return
+    ordinals = [datetime.strptime(d, "%Y-%m-%d").toordinal() for d, _ in points]
+    from .downsample import lttb_downsample
+    keep = lttb_downsample(ordinals, [v for _, v in points], PDF_CHART_POINTS)
+    ordinals = [ordinals[i] for i in keep]
+    values = [points[i][1] for i in keep]
+    lo, hi = min(values), max(values)
+    x_span = (ordinals[-1] - ordinals[0]) or 1
+    y_span = (hi - lo) or 1
+    coords = [
+        (x + (o - ordinals[0]) / x_span * w, top + height - (v - lo) / y_span * height)
+        for o, v in zip(ordinals, values)
+    ]
+    pdf.set_draw_color(*_hex_to_rgb(color))
+    pdf.set_line_width(0.5)
+    for (x1, y1), (x2, y2) in zip(coords, coords[1:]):
+        pdf.line(x1, y1, x2, y2)
+    pdf.set_line_width(0.2)
+    pdf.set_font("Arial", "", 7)
+    pdf.set_xy(x, top + height)
+    pdf.cell(w / 2, 4, points[keep[0]][0])
+    pdf.cell(w / 2, 4, points[keep[-1]][0], align="R")
+    pdf.set_xy(x + w + 1, top - 2)
+    pdf.cell(12, 4, f"{hi:g}")
+    pdf.set_xy(x + w + 1, top + height - 2)
+    pdf.cell(12, 4, f"{lo:g}")
+
+@profiled("report.build_pdf")
+def build_pdf_report(title, entries, progress=lambda fraction, message: None):
+    """Render a PDF (summary, trend charts, daily table) for (date, entry) pairs; returns bytes."""
+    from fpdf import FPDF  # only the Reports page ever renders a PDF
+    
+    entries = list(entries)
+    dates = [d for d, _ in entries]
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 18)
+    pdf.cell(0, 10, _pdf_text(f"FitTracker Pro - {title}"), ln=1, align="C")
+    pdf.set_font("Arial", "", 10)
+    span = f"{dates[0]} to {dates[-1]}" if dates else "no data"
+    pdf.cell(0, 6, _pdf_text(f"{span}  |  generated {datetime.now():%Y-%m-%d %H:%M}"), ln=1, align="C")
+    
+    progress(0.1, "Summarizing")
+    totals = _empty_bucket()  # one rollup bucket spanning the whole range
+    for _, entry in entries:
+        _add_to_bucket(totals, entry)
+    weights = [e.get("weight") for _, e in entries if e.get("weight") is not None]
+    pdf.ln(4)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 7, "Summary", ln=1)
+    pdf.set_font("Arial", "", 10)
+    for label, value in [
+        ("Days logged", totals["days"]),
+        ("Days with all goals met", totals["goal_hits"]["all"]),
+        ("Average calories", f"{rollup_mean(totals, 'total_calories') or 0:.0f} kcal"),
+        ("Average protein", f"{rollup_mean(totals, 'total_protein') or 0:.1f} g"),
+        ("Average steps", f"{rollup_mean(totals, 'steps') or 0:,.0f}"),
+        ("Weight change", f"{weights[-1] - weights[0]:+.1f} kg" if len(weights) > 1 else "n/a"),
+    ]:
+        pdf.cell(60, 6, label)
+        pdf.cell(0, 6, _pdf_text(value), ln=1)
+    
+    progress(0.3, "Drawing charts")
+    chart_w, chart_h = 80, 55
+    for i, (key, (chart_title, _, color)) in enumerate(PROGRESS_METRICS.items()):
+        x = 15 + (i % 2) * (chart_w + 15)
+        y = 95 + (i // 2) * (chart_h + 5)
+        _pdf_line_chart(pdf, chart_title, dates, [e.get(key) for _, e in entries], x, y, chart_w, chart_h, color)
+    
+    progress(0.6, "Writing daily table")
+    pdf.add_page()
+    columns = [("Date", 28, "date"), ("Weight", 22, "weight"), ("Calories", 26, "total_calories"),
+               ("Protein", 24, "total_protein"), ("Steps", 24, "steps"), ("Burned", 26, "total_calories_burned"),
+               ("Net", 24, "net_calories")]
+    pdf.set_font("Arial", "B", 9)
+    for label, width, _ in columns:
+        pdf.cell(width, 7, label, border=1, align="C")
+    pdf.ln()
+    pdf.set_font("Arial", "", 9)
+    for row, (date_str, entry) in enumerate(entries):
+        for _, width, key in columns:
+            value = date_str if key == "date" else entry.get(key)
+            text = "" if value is None else (value if isinstance(value, str) else f"{value:g}")
+            pdf.cell(width, 6, text, border=1, align="C")
+        pdf.ln()
+        if row % 50 == 0:
+            progress(0.6 + 0.35 * row / max(len(entries), 1), "Writing daily table")
+    
+    progress(0.95, "Finishing")
+    out = pdf.output(dest="S")
+    return out.encode("latin-1") if isinstance(out, str) else bytes(out)
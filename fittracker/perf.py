@@ -0,0 +1,111 @@
+"""Lightweight span timing for reruns and storage/compute calls."""
+
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Hot-path timing. Spans and @profiled functions record into a process-wide
+# Profiler that keeps a rolling window of latencies per section. When it is
+# disabled, span() hands back one shared no-op object and @profiled calls
+# straight through, so the instrumentation costs a flag check.
+PROFILE_WINDOW = 500  # samples kept per section
+PROFILE_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, float("inf"))
+
+class _Span:
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = time.perf_counter()
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.end()
+
+    def end(self):
+        self.profiler.record(self.name, time.perf_counter() - self.started)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def end(self):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Profiler:
+    def __init__(self, enabled=False, window=PROFILE_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def span(self, name):
+        """Time a block: `with PROFILER.span(name):`, or call .end() on the result."""
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def record(self, name, seconds):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(seconds * 1000)
+
+    def summary(self):
+        """Per-section count, mean/p50/p95/max in ms and histogram bucket counts."""
+        with self.lock:
+            snapshot = {name: sorted(samples) for name, samples in self.samples.items()}
+        rows = []
+        for name, ms in sorted(snapshot.items()):
+            histogram = [0] * len(PROFILE_BUCKETS_MS)
+            for value in ms:
+                histogram[bisect.bisect_left(PROFILE_BUCKETS_MS, value)] += 1
+            rows.append({
+                "section": name,
+                "count": len(ms),
+                "mean_ms": sum(ms) / len(ms),
+                "p50_ms": ms[len(ms) // 2],
+                "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+                "max_ms": ms[-1],
+                "histogram": dict(zip([f"<={b:g}ms" for b in PROFILE_BUCKETS_MS], histogram)),
+            })
+        return rows
+
+    def to_json(self):
+        return json.dumps({"window": self.window, "sections": self.summary()}, indent=2)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+# One profiler per process; module state outlives Streamlit reruns
+PROFILER = Profiler(enabled=os.environ.get("FITTRACKER_PROFILE") == "1")
+
+def get_profiler():
+    return PROFILER
+
+def profiled(name):
+    """Decorator recording each call of a storage/compute function under `name`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return fn(*args, **kwargs)
+            with PROFILER.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,147 @@
+"""Re-derive stored totals across a whole diary after FOOD_DATA or the step constants change.
+
+    python -m fittracker.recompute [--user NAME] [--workers N] [--dry-run]
+
+Saved entries freeze their derived fields (calorie and protein totals,
+calories burned, net calories, BMI, miles) at save time. This recomputes
+them from each day's stored inputs with compute_entry_totals, spread over
+a process pool in chunks of days, and writes back only the days whose
+numbers changed, in batched version-checked saves. A day saved while the
+job runs is re-derived from its new inputs before being written, so the
+job never reverts an edit.
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .nutrition import compute_entry_totals
+from .storage import ConflictError, entry_version, get_shared_diary
+
+RECOMPUTE_CHUNK_DAYS = 2_000  # days per worker task
+RECOMPUTE_BATCH_DAYS = 1_000  # changed days per write-back transaction
+RECOMPUTE_RETRIES = 3
+
+# The stored inputs compute_entry_totals reads; only these (and the stored
+# totals to compare against) are sent to the workers
+INPUT_FIELDS = ("food", "additional_meals", "exercises", "direct_calories", "steps", "weight", "height")
+DERIVED_FIELDS = ("bmi", "total_calories", "total_protein", "total_calories_burned", "net_calories", "miles_walked")
+
+class RecomputeReport:
+    """Which days' derived fields changed, from what to what."""
+
+    def __init__(self):
+        self.days_checked = 0
+        self.changed = {}  # date -> {field: (stored, recomputed)}
+        self.seconds = 0.0
+        self.written = False
+
+    def summary(self):
+        verb = "updated" if self.written else "would change"
+        return (f"{len(self.changed):,} of {self.days_checked:,} days {verb} "
+                f"in {self.seconds:.2f}s")
+
+def recompute_chunk(items):
+    """[(date, slim entry)] -> [(date, recomputed totals, {field: (stored, recomputed)})] for changed days.
+
+    Runs in the worker processes, so it is a module-level function over
+    plain data.
+    """
+    # Deliberately per day, not nutrient_matrix.calculate_macros_batch: a day counts
+    # as changed when any total differs from the stored one at all, so this must
+    # repeat compute_entry_totals' arithmetic exactly. The matrix product sums in a
+    # different order with per-gram factors (last-bit differences on about a quarter
+    # of days, enough to flip a rounding), and it leaves out catalog foods.
+    changed = []
+    for date_str, entry in items:
+        totals = compute_entry_totals(entry)
+        diff = {field: (entry.get(field), value) for field, value in totals.items() if entry.get(field) != value}
+        if diff:
+            changed.append((date_str, totals, diff))
+    return changed
+
+def _slim(entry):
+    return {k: entry[k] for k in entry if k in INPUT_FIELDS or k in DERIVED_FIELDS}
+
+def _run_chunks(chunks, workers, progress):
+    if workers <= 1 or len(chunks) <= 1:
+        # Spawning workers costs more than a chunk or two of arithmetic
+        for i, chunk in enumerate(chunks):
+            yield recompute_chunk(chunk)
+            progress(0.8 * (i + 1) / len(chunks), f"Recomputed {i + 1}/{len(chunks)} chunks")
+        return
+    # spawn, not fork: the app server is multi-threaded and forking it can deadlock
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+        for i, result in enumerate(pool.map(recompute_chunk, chunks)):
+            yield result
+            progress(0.8 * (i + 1) / len(chunks), f"Recomputed {i + 1}/{len(chunks)} chunks")
+
+def _write_back(diary, new_totals, versions, progress):
+    """Save the recomputed totals in batches of whole days.
+
+    Days whose version moved since the snapshot were saved during the run;
+    their totals are re-derived here from what is stored now.
+    """
+    dates = sorted(new_totals)
+    for i in range(0, len(dates), RECOMPUTE_BATCH_DAYS):
+        batch = dates[i:i + RECOMPUTE_BATCH_DAYS]
+        for attempt in range(RECOMPUTE_RETRIES):
+            current = diary.get()
+            items = []
+            for date_str in batch:
+                entry = current.get(date_str)
+                if entry is None:
+                    continue
+                totals = new_totals[date_str] if entry_version(entry) == versions[date_str] else compute_entry_totals(entry)
+                items.append((date_str, {**entry, **totals}))
+            try:
+                diary.save_entries(items)
+                break
+            except ConflictError:
+                if attempt == RECOMPUTE_RETRIES - 1:
+                    raise
+        progress(0.8 + 0.2 * min(i + len(batch), len(dates)) / len(dates), f"Saved {i + len(batch):,} days")
+
+def recompute_history(user=None, workers=None, write=True, chunk_days=RECOMPUTE_CHUNK_DAYS,
+                      progress=lambda fraction, message: None):
+    """Re-derive every day's totals in user's diary; returns a RecomputeReport.
+
+    workers defaults to the CPU count. With write=False nothing is saved
+    and the report lists what would change.
+    """
+    start = time.perf_counter()
+    report = RecomputeReport()
+    diary = get_shared_diary(user=user)
+    data = diary.get()
+    items = [(d, _slim(e)) for d, e in data.items()]
+    versions = {d: entry_version(e) for d, e in data.items()}
+    report.days_checked = len(items)
+    chunks = [items[i:i + chunk_days] for i in range(0, len(items), chunk_days)]
+    new_totals = {}
+    for result in _run_chunks(chunks, workers or os.cpu_count() or 1, progress):
+        for date_str, totals, diff in result:
+            new_totals[date_str] = totals
+            report.changed[date_str] = diff
+    if write and new_totals:
+        _write_back(diary, new_totals, versions, progress)
+        report.written = True
+    report.seconds = time.perf_counter() - start
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", help="account whose diary to recompute (default: the legacy diary)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without saving")
+    args = parser.parse_args()
+    report = recompute_history(user=args.user, workers=args.workers, write=not args.dry_run)
+    print(report.summary())
+    for date_str in sorted(report.changed):
+        fields = ", ".join(f"{field} {old} -> {new}" for field, (old, new) in report.changed[date_str].items())
+        print(f"  {date_str}: {fields}")
+
+if __name__ == "__main__":
+    main()
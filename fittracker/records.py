@@ -0,0 +1,248 @@
+"""Typed diary entries: one slotted, validated record per day.
+
+Stored days are JSON objects; in memory each becomes a DayEntry. Its fields
+are slots rather than a per-day dict of repeated keys, and its food log is
+a shared tuple of food names plus an array of quantities, because most days
+log the same foods in the same order. A multi-year diary takes a fraction
+of the memory of the parsed JSON.
+
+DayEntry is read-only and behaves like a Mapping, so code written against
+entry dicts (entry["steps"], entry.get("weight")) keeps working. Hot loops
+can read attributes directly (entry.steps). Every field has a schema type
+and a default, so a record never lacks a field. from_dict() checks and
+coerces each one and raises RecordError naming the day and field on bad
+input. to_dict() is the fast way back to a plain, mutable dict for editing
+and for the stores' serializers.
+"""
+
+import math
+import sys
+from array import array
+from datetime import date
+from collections.abc import Mapping
+from numbers import Real
+
+from .nutrition import DEFAULT_HEIGHT_CM
+
+DEFAULT_AGE = 24
+
+class RecordError(ValueError):
+    """A stored or submitted entry that doesn't fit the schema."""
+
+def _number(value):
+    # json.load reads NaN and Infinity, which no day can actually hold
+    if isinstance(value, bool) or not isinstance(value, Real) or not math.isfinite(value):
+        raise TypeError("expected a finite number")
+    return float(value)
+
+def _optional_number(value):
+    return None if value is None else _number(value)
+
+def _count(value):
+    if isinstance(value, bool) or not isinstance(value, Real) or not math.isfinite(value) or value != int(value) or value < 0:
+        raise TypeError("expected a whole number >= 0")
+    return int(value)
+
+def _flag(value):
+    if not isinstance(value, bool):
+        raise TypeError("expected true or false")
+    return value
+
+def _text(value):
+    if not isinstance(value, str):
+        raise TypeError("expected a string")
+    return value
+
+def _iso_date(value):
+    # date.fromisoformat alone also takes forms like 20240102 and 2024-W01-1
+    if not isinstance(value, str) or len(value) != 10 or value[4] != "-" or value[7] != "-":
+        raise TypeError("expected a YYYY-MM-DD date")
+    date.fromisoformat(value)
+    return value
+
+def _rows(*fields):
+    """Validator for a list of small objects (meals, workouts) with the given fields."""
+    def check(value):
+        if not isinstance(value, (list, tuple)):
+            raise TypeError("expected a list")
+        rows = []
+        for row in value:
+            if not isinstance(row, Mapping):
+                raise TypeError("expected a list of objects")
+            row = dict(row)
+            for name, kind in fields:
+                if name in row:
+                    row[name] = kind(row[name])
+            rows.append(row)
+        return tuple(rows) if rows else ()
+    return check
+
+# name -> (validator, default); defaults are what new_entry() gives an unlogged day
+ENTRY_SCHEMA = {
+    "date": (_iso_date, None),
+    "weight": (_optional_number, None),
+    "height": (_number, DEFAULT_HEIGHT_CM),
+    "age": (_count, DEFAULT_AGE),
+    "bmi": (_optional_number, None),
+    "steps": (_count, 0),
+    "workout_notes": (_text, ""),
+    "food": (None, None),  # validated by _food()
+    "additional_meals": (_rows(("name", _text), ("calories", _number)), ()),
+    "exercises": (_rows(("type", _text), ("intensity", _count), ("calories", _number)), ()),
+    "direct_calories": (_number, 0.0),
+    "total_calories": (_number, 0.0),
+    "total_protein": (_number, 0.0),
+    "total_calories_burned": (_optional_number, None),
+    "net_calories": (_number, 0.0),
+    "miles_walked": (_optional_number, None),
+    "is_gym_day": (_flag, True),
+    "_version": (_count, 0),
+}
+ENTRY_FIELDS = tuple(ENTRY_SCHEMA)
+_SLOT_FIELDS = tuple(name for name in ENTRY_FIELDS if name != "food")
+_EMPTY_FOOD = array("d")
+
+# Food-name tuples shared between records; a diary has only a few distinct ones
+_food_name_sets = {}
+
+def _food(value):
+    if not isinstance(value, Mapping):
+        raise TypeError("expected a {food: quantity} object")
+    names, quantities = [], array("d")
+    for name, qty in value.items():
+        if not isinstance(name, str):
+            raise TypeError("food names must be strings")
+        qty = 0.0 if qty is None else _number(qty)
+        if qty < 0:
+            raise TypeError(f"negative quantity for {name}")
+        names.append(name)
+        quantities.append(qty)
+    names = tuple(names)
+    shared = _food_name_sets.get(names)
+    if shared is None:
+        shared = _food_name_sets[names] = tuple(sys.intern(n) for n in names)
+    return shared, quantities
+
+class DayEntry(Mapping):
+    """One day of the diary; see the module docstring."""
+
+    __slots__ = _SLOT_FIELDS + ("food_names", "food_quantities", "extra")
+
+    def __init__(self, date_str=None):
+        for name in _SLOT_FIELDS:
+            setattr(self, name, ENTRY_SCHEMA[name][1])
+        self.date = date_str
+        self.food_names = ()
+        self.food_quantities = _EMPTY_FOOD
+        self.extra = None  # fields outside the schema, kept so saving doesn't drop them
+
+    @classmethod
+    def from_dict(cls, raw, date_str=None):
+        """Validate and convert a stored or submitted entry dict.
+
+        Missing fields take their defaults; a wrongly typed field raises
+        RecordError. date_str, when given, is the day the entry is stored
+        under and wins over its "date" field; both must be YYYY-MM-DD.
+        """
+        if isinstance(raw, DayEntry):
+            raw = raw.to_dict()
+        if not isinstance(raw, Mapping):
+            raise RecordError(f"{date_str or '?'}: entry is not an object")
+        if date_str is not None:
+            try:
+                _iso_date(date_str)
+            except (TypeError, ValueError, OverflowError):
+                raise RecordError(f"{date_str!r} is not a YYYY-MM-DD date")
+        record = cls(date_str)
+        extra = None
+        for name, value in raw.items():
+            try:
+                if name == "food":
+                    record.food_names, record.food_quantities = _food(value)
+                elif name in ENTRY_SCHEMA:
+                    value = ENTRY_SCHEMA[name][0](value)
+                    if name != "date" or date_str is None:
+                        setattr(record, name, value)
+                else:
+                    if extra is None:
+                        extra = {}
+                    extra[name] = value
+            except (TypeError, ValueError, OverflowError) as e:
+                raise RecordError(f"{date_str or raw.get('date', '?')}: bad '{name}' ({e}): {value!r}")
+        record.extra = extra
+        return record
+
+    @property
+    def food(self):
+        return dict(zip(self.food_names, self.food_quantities))
+
+    def to_dict(self):
+        """A plain dict copy of the entry, safe to edit and to serialize."""
+        out = {name: getattr(self, name) for name in _SLOT_FIELDS}
+        out["food"] = self.food
+        out["additional_meals"] = [dict(row) for row in self.additional_meals]
+        out["exercises"] = [dict(row) for row in self.exercises]
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def __getitem__(self, key):
+        if key == "food":
+            return self.food
+        if key in ENTRY_SCHEMA:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        """Like dict.get, except a field that is unset (None) also gives the default."""
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __iter__(self):
+        yield from ENTRY_FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(ENTRY_FIELDS) + len(self.extra or ())
+
+    def __contains__(self, key):
+        return key in ENTRY_SCHEMA or bool(self.extra and key in self.extra)
+
+    def __eq__(self, other):
+        if isinstance(other, DayEntry):
+            other = other.to_dict()
+        return isinstance(other, Mapping) and self.to_dict() == dict(other)
+
+    __hash__ = None
+
+    def __copy__(self):
+        return self  # read-only
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (DayEntry.from_dict, (self.to_dict(), self.date))
+
+    def __repr__(self):
+        return f"DayEntry({self.date!r}, steps={self.steps}, total_calories={self.total_calories}, foods={len(self.food_names)})"
+
+def new_entry(date_str):
+    """A blank diary entry for a day nothing has been logged on yet."""
+    return DayEntry(date_str).to_dict()
+
+def load_records(raw_data):
+    """{date: DayEntry} from {date: entry dict}, plus {date: error} for the records rejected."""
+    data, rejected = {}, {}
+    for date_str, raw in raw_data.items():
+        try:
+            data[date_str] = DayEntry.from_dict(raw, date_str)
+        except RecordError as e:
+            rejected[date_str] = str(e)
+    return data, rejected
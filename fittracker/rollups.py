@@ -0,0 +1,77 @@
+"""Per-ISO-week and per-month aggregates kept current one saved day at a time."""
+
+from datetime import datetime, timedelta
+
+from .nutrition import goals_met
+
+ROLLUP_METRICS = ("total_calories", "total_protein", "steps", "net_calories", "weight")
+
+def week_key(date_str):
+    year, week, _ = datetime.strptime(date_str, "%Y-%m-%d").isocalendar()
+    return f"{year}-W{week:02d}"
+
+def month_key(date_str):
+    return date_str[:7]
+
+def _bucket_bounds(kind, key):
+    """First and last date string covered by a week or month bucket."""
+    if kind == "weeks":
+        year, week = key.split("-W")
+        monday = datetime.fromisocalendar(int(year), int(week), 1)
+        return monday.strftime("%Y-%m-%d"), (monday + timedelta(days=6)).strftime("%Y-%m-%d")
+    return f"{key}-01", f"{key}-31"
+
+def _empty_bucket():
+    return {
+        "days": 0,
+        "goal_hits": {"calories": 0, "protein": 0, "steps": 0, "all": 0},
+        "metrics": {m: {"sum": 0.0, "count": 0, "min": None, "max": None} for m in ROLLUP_METRICS},
+    }
+
+def _add_to_bucket(bucket, entry):
+    bucket["days"] += 1
+    for goal, hit in goals_met(entry).items():
+        bucket["goal_hits"][goal] += hit
+    for metric in ROLLUP_METRICS:
+        value = entry.get(metric)
+        if value is None:
+            continue
+        agg = bucket["metrics"][metric]
+        agg["sum"] += value
+        agg["count"] += 1
+        agg["min"] = value if agg["min"] is None else min(agg["min"], value)
+        agg["max"] = value if agg["max"] is None else max(agg["max"], value)
+
+def rollup_mean(bucket, metric):
+    agg = bucket["metrics"][metric]
+    return agg["sum"] / agg["count"] if agg["count"] else None
+
+class RollupStore:
+    """Per-ISO-week and per-month sums, counts, min/max and goal-hit counts.
+
+    Built in one pass on load, then kept current by update_day() on each
+    save: only the saved day's week and month buckets are rebuilt, from the
+    handful of days they cover, so reports never scan the whole history.
+    Buckets are replaced, never mutated, so readers always see whole ones.
+    """
+
+    def __init__(self, data=None):
+        self.weeks = {}
+        self.months = {}
+        data = data or {}
+        # Date order, same as update_day(), so float sums come out identical
+        for date_str in sorted(data):
+            for buckets, key in ((self.weeks, week_key(date_str)), (self.months, month_key(date_str))):
+                _add_to_bucket(buckets.setdefault(key, _empty_bucket()), data[date_str])
+
+    def update_day(self, date_str, data, index):
+        for kind, key in (("weeks", week_key(date_str)), ("months", month_key(date_str))):
+            bucket = _empty_bucket()
+            for d in index.range(*_bucket_bounds(kind, key)):
+                _add_to_bucket(bucket, data[d])
+            getattr(self, kind)[key] = bucket
+
+    def latest(self, kind, limit):
+        """The most recent `limit` buckets of a kind ("weeks" or "months"), newest first."""
+        buckets = getattr(self, kind)
+        return [(key, buckets[key]) for key in sorted(buckets, reverse=True)[:limit]]
@@ -0,0 +1,687 @@
+"""Diary storage: JSON snapshot + journal or SQLite, and the shared in-process cache."""
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; locks there only cover this process's threads
+    fcntl = None
+
+from .nutrition import goal_thresholds
+from .perf import profiled
+from .records import DayEntry, RecordError, load_records
+from .rollups import RollupStore
+
+DATA_FILE = "fitness_diary_data.json"
+JOURNAL_FILE = "fitness_diary_data.journal"
+JOURNAL_COMPACT_BYTES = 256 * 1024  # fold the journal into DATA_FILE past this size
+SQLITE_FILE = "fitness_diary.db"
+STORAGE_BACKEND = os.environ.get("FITTRACKER_STORAGE", "json")  # "json" or "sqlite"
+USERS_DIR = os.environ.get("FITTRACKER_USERS_DIR", "users")  # one partition directory per account
+
+# Storage backends share one small interface: load_all / version / upsert /
+# upsert_many / replace_all / locked. Day and range reads come from SharedDiary's
+# parsed snapshot (date index, rollups), not the stores. A backend that
+# can answer without loading the whole diary adds iter_entries (streamed
+# exports) and page (the History browser); SharedDiary uses them when present.
+# load_data, save_data and save_entry delegate to whichever backend
+# STORAGE_BACKEND selects.
+
+VERSION_KEY = "_version"  # per-date save counter stored inside each entry
+HISTORY_PAGE_SIZE = 25
+HISTORY_SORT_FIELDS = ("date", "weight", "total_calories", "total_protein", "net_calories", "steps")
+
+def entry_version(entry):
+    """How many times this day has been saved (0 for unsaved or pre-versioning entries)."""
+    return (entry or {}).get(VERSION_KEY, 0)
+
+class ConflictError(Exception):
+    """A save was based on an older version of a day than the one stored.
+
+    `conflicts` maps each date to (expected version, stored version).
+    """
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__("Changed elsewhere since loaded: " + ", ".join(sorted(conflicts)))
+
+def _fsync_dir(path):
+    """Flush a rename in `path`'s directory to disk (a no-op where unsupported)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class FileLock:
+    """Advisory lock on a lock file (flock) that also serializes threads.
+
+    Re-entrant per thread, so a caller can hold it around a read-check-write
+    while the store methods it calls take it again. Other processes using the
+    same lock file wait; processes that don't are not stopped (advisory).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                self._thread_lock.release()
+                return False
+            except BaseException:
+                os.close(fd)
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class JournalStore:
+    """JSON snapshot (DATA_FILE) plus an append-only journal of day records.
+
+    Saving a day appends one line, so it costs the same no matter how much
+    history exists; compaction folds the journal back into the snapshot in the
+    background. Both locks are file locks, so appends, compaction and rewrites
+    are also serialized against other processes sharing the files.
+    """
+
+    def __init__(self, data_file=DATA_FILE, journal_file=JOURNAL_FILE):
+        self.data_file = data_file
+        self.journal_file = journal_file
+        self.compacting_file = journal_file + ".compacting"
+        self.journal_lock = FileLock(journal_file + ".lock")
+        self.compaction_lock = FileLock(journal_file + ".compact.lock")
+
+    def _read_snapshot(self):
+        if os.path.exists(self.data_file):
+            with open(self.data_file, "r") as f:
+                return json.load(f)
+        return {}
+
+    def _replay_journal(self, data, path):
+        """Apply journal records from path on top of data, skipping torn lines."""
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partial record left by a crash mid-append
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                data[record["date"]] = record["entry"]
+
+    def _write_snapshot_tmp(self, data):
+        """Serialize data next to the snapshot; the caller renames it into place."""
+        tmp_path = f"{self.data_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+
+    def load_all(self):
+        with self.journal_lock:
+            data = self._read_snapshot()
+            self._replay_journal(data, self.compacting_file)
+            self._replay_journal(data, self.journal_file)
+        return data
+
+    def version(self):
+        """Cheap change token: (mtime, size) of every file that makes up the diary."""
+        stamps = []
+        for path in (self.data_file, self.compacting_file, self.journal_file):
+            try:
+                st_ = os.stat(path)
+                stamps.append((st_.st_mtime_ns, st_.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def locked(self):
+        """Hold this across a read-check-write; upserts inside it re-enter the lock."""
+        return self.journal_lock
+
+    def replace_all(self, data):
+        """Rewrite the whole diary as a fresh snapshot and drop the journal."""
+        with self.compaction_lock:
+            tmp_path = self._write_snapshot_tmp(data)
+            with self.journal_lock:
+                os.replace(tmp_path, self.data_file)
+                for path in (self.compacting_file, self.journal_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+                _fsync_dir(self.data_file)
+
+    def upsert_many(self, items):
+        """Append (date, entry) records to the journal with a single fsync."""
+        payload = b"".join(
+            json.dumps({"date": d, "entry": e}, separators=(",", ":")).encode("utf-8") + b"\n" for d, e in items
+        )
+        if not payload:
+            return
+        with self.journal_lock:
+            with open(self.journal_file, "ab") as f:
+                # Start on a fresh line if a previous append was cut short
+                if f.tell() > 0:
+                    with open(self.journal_file, "rb") as tail:
+                        tail.seek(-1, os.SEEK_END)
+                        if tail.read(1) != b"\n":
+                            f.write(b"\n")
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                journal_size = f.tell()
+        if journal_size >= JOURNAL_COMPACT_BYTES:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def upsert(self, date_str, entry):
+        """Append a single day's entry to the journal."""
+        self.upsert_many([(date_str, entry)])
+
+    def compact(self):
+        """Fold the journal into the snapshot without blocking new appends."""
+        if not self.compaction_lock.acquire(blocking=False):
+            return  # another compaction is already running
+        try:
+            with self.journal_lock:
+                # A leftover file means an earlier compaction crashed; fold it first
+                if not os.path.exists(self.compacting_file):
+                    if not os.path.exists(self.journal_file):
+                        return
+                    os.replace(self.journal_file, self.compacting_file)
+            data = self._read_snapshot()
+            self._replay_journal(data, self.compacting_file)
+            tmp_path = self._write_snapshot_tmp(data)
+            with self.journal_lock:
+                os.replace(tmp_path, self.data_file)
+                os.remove(self.compacting_file)
+                _fsync_dir(self.data_file)
+        finally:
+            self.compaction_lock.release()
+
+
+def _goal_met_sql():
+    """SQL twin of nutrition.goals_met(entry)["all"] over the entries columns."""
+    days = []
+    for gym in (True, False):
+        targets = goal_thresholds(gym)
+        days.append(
+            f"(COALESCE(is_gym_day, 1) = {int(gym)}"
+            f" AND COALESCE(total_calories, 0) >= {targets['calories']!r}"
+            f" AND COALESCE(total_protein, 0) >= {targets['protein']!r}"
+            f" AND COALESCE(steps, 0) >= {targets['steps']!r})"
+        )
+    return f"({' OR '.join(days)})"
+
+_GOAL_MET_SQL = _goal_met_sql()
+
+class SQLiteStore:
+    """One row per date, keyed on date, with the derived totals in real columns.
+
+    The full entry is kept as JSON in `payload`; the columns exist so range
+    queries and aggregates can run in SQL without decoding every day.
+    """
+
+    COLUMNS = ("total_calories", "total_protein", "net_calories", "steps", "weight", "is_gym_day")
+
+    def __init__(self, db_file=SQLITE_FILE):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.write_lock = FileLock(db_file + ".lock")
+        self.writes = 0
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    date TEXT PRIMARY KEY,
+                    total_calories REAL,
+                    total_protein REAL,
+                    net_calories REAL,
+                    steps INTEGER,
+                    weight REAL,
+                    is_gym_day INTEGER,
+                    payload TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+            # Tables created before the History filters lack is_gym_day; fill it from the payloads
+            if "is_gym_day" not in {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}:
+                self.conn.execute("ALTER TABLE entries ADD COLUMN is_gym_day INTEGER")
+                self.conn.execute("UPDATE entries SET is_gym_day = COALESCE(json_extract(payload, '$.is_gym_day'), 1)")
+
+    def _row(self, date_str, entry):
+        return (date_str, *(entry.get(col) for col in self.COLUMNS), json.dumps(entry))
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def load_all(self):
+        return {d: json.loads(p) for d, p in self._query("SELECT date, payload FROM entries ORDER BY date")}
+
+    def iter_entries(self, start_str=None, end_str=None):
+        """Stream (date, entry) pairs in date order without loading the whole table."""
+        # Own connection, so a long export doesn't hold the lock writers need
+        conn = sqlite3.connect(self.db_file)
+        try:
+            rows = conn.execute(
+                "SELECT date, payload FROM entries WHERE date BETWEEN ? AND ? ORDER BY date",
+                (start_str or "", end_str or "9999-12-31"),
+            )
+            for date_str, payload in rows:
+                yield date_str, json.loads(payload)
+        finally:
+            conn.close()
+
+    def page(self, offset, limit, sort="date", descending=True, gym_day=None, goal_met=None, weight_range=None,
+             exclude=()):
+        """(matching count, [(date, entry)]) for one page, filtered, sorted and cut in SQL.
+
+        Only the returned page's payloads are decoded. Dates in exclude are
+        left out of both the count and the page. See SharedDiary.page.
+        """
+        # sort is spliced into the SQL, so it must be one of the known column names
+        if sort not in HISTORY_SORT_FIELDS:
+            raise ValueError(f"Can't sort the history by {sort!r}")
+        where, params = [], []
+        if gym_day is not None:
+            where.append("COALESCE(is_gym_day, 1) = ?")
+            params.append(int(gym_day))
+        if goal_met is not None:
+            where.append(_GOAL_MET_SQL if goal_met else f"NOT {_GOAL_MET_SQL}")
+        lo, hi = weight_range or (None, None)
+        if lo is not None:
+            where.append("weight >= ?")
+            params.append(lo)
+        if hi is not None:
+            where.append("weight <= ?")
+            params.append(hi)
+        if exclude:
+            where.append(f"date NOT IN ({', '.join('?' * len(exclude))})")
+            params.extend(exclude)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        if descending not in (True, False):
+            raise ValueError("descending must be True or False")
+        order = "DESC" if descending else "ASC"
+        tiebreak = "" if sort == "date" else f", date {order}"
+        total = self._query(f"SELECT COUNT(*) FROM entries {where_sql}", params)[0][0]
+        rows = self._query(
+            f"SELECT date, payload FROM entries {where_sql} ORDER BY {sort} {order} NULLS LAST{tiebreak} LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        )
+        return total, [(d, json.loads(p)) for d, p in rows]
+
+    def version(self):
+        """data_version moves on commits from other connections, writes on ours."""
+        return (self._query("PRAGMA data_version")[0][0], self.writes)
+
+    def locked(self):
+        """Hold this across a read-check-write (SQLite already makes each write atomic)."""
+        return self.write_lock
+
+    def _upsert_sql(self):
+        updates = ", ".join(f"{col} = excluded.{col}" for col in self.COLUMNS)
+        return (
+            f"INSERT INTO entries (date, {', '.join(self.COLUMNS)}, payload) "
+            f"VALUES ({', '.join('?' * (len(self.COLUMNS) + 2))}) "
+            f"ON CONFLICT(date) DO UPDATE SET {updates}, payload = excluded.payload"
+        )
+
+    def upsert_many(self, items):
+        """Write (date, entry) pairs in a single transaction."""
+        with self.lock, self.conn:
+            self.conn.executemany(self._upsert_sql(), (self._row(d, e) for d, e in items))
+            self.writes += 1
+
+    def upsert(self, date_str, entry):
+        self.upsert_many([(date_str, entry)])
+
+    def replace_all(self, data):
+        # One transaction, so readers never see the table empty or half-filled
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.executemany(self._upsert_sql(), (self._row(d, e) for d, e in data.items()))
+            self.writes += 1
+
+
+def migrate_json_to_sqlite(data_file=DATA_FILE, journal_file=JOURNAL_FILE, db_file=SQLITE_FILE):
+    """One-shot copy of the JSON diary (snapshot + journal) into SQLite."""
+    data = JournalStore(data_file, journal_file).load_all()
+    store = SQLiteStore(db_file)
+    store.upsert_many(sorted(data.items()))
+    return store
+
+def partition_paths(user=None):
+    """(data_file, journal_file, sqlite_file) for a user's partition.
+
+    user=None is the original single-user diary in the working directory.
+    """
+    if user is None:
+        return DATA_FILE, JOURNAL_FILE, SQLITE_FILE
+    base = os.path.join(USERS_DIR, user)
+    return tuple(os.path.join(base, os.path.basename(path)) for path in (DATA_FILE, JOURNAL_FILE, SQLITE_FILE))
+
+def claim_legacy_diary(user):
+    """Move the single-user diary files into `user`'s empty partition.
+
+    Used once, for the first account, so the pre-accounts history isn't left
+    behind. Returns True if anything was moved.
+    """
+    targets = partition_paths(user)
+    if any(os.path.exists(path) for path in targets):
+        return False
+    os.makedirs(os.path.dirname(targets[0]), exist_ok=True)
+    moved = False
+    for source, target in zip(partition_paths(None), targets):
+        for suffix in ("", "-wal", "-shm") if source == SQLITE_FILE else ("",):
+            if os.path.exists(source + suffix):
+                os.replace(source + suffix, target + suffix)
+                moved = True
+    return moved
+
+# Stores and shared diaries are process-wide singletons per (backend, user).
+# The registry lock only guards the dicts; building a partition's store
+# happens under that partition's own lock, so users never wait on each other.
+_stores = {}
+_diaries = {}
+_partition_locks = {}
+_registry_lock = threading.Lock()
+
+def _partition_lock(key):
+    with _registry_lock:
+        return _partition_locks.setdefault(key, threading.Lock())
+
+def _open_store(backend, user):
+    data_file, journal_file, sqlite_file = partition_paths(user)
+    if user is not None:
+        os.makedirs(os.path.dirname(data_file), exist_ok=True)
+    if backend == "sqlite":
+        # Under the database's write lock, so concurrent processes migrate once
+        with FileLock(sqlite_file + ".lock"):
+            if not os.path.exists(sqlite_file) and os.path.exists(data_file):
+                return migrate_json_to_sqlite(data_file, journal_file, sqlite_file)
+            return SQLiteStore(sqlite_file)
+    return JournalStore(data_file, journal_file)
+
+def get_store(backend=None, user=None):
+    key = (backend or STORAGE_BACKEND, user)
+    store = _stores.get(key)
+    if store is None:
+        with _partition_lock(key):
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = _open_store(*key)
+    return store
+
+class DateIndex:
+    """Diary dates kept in sorted order for binary-search range lookups.
+
+    Keys are ISO "YYYY-MM-DD" strings, which already sort chronologically, so
+    each date is ordered once on insert and never parsed again.
+    """
+
+    def __init__(self, dates=()):
+        self.dates = sorted(dates)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def with_date(self, date_str):
+        """Copy of this index including date_str (insert, no re-sort)."""
+        index = DateIndex()
+        index.dates = list(self.dates)
+        pos = bisect.bisect_left(index.dates, date_str)
+        if pos == len(index.dates) or index.dates[pos] != date_str:
+            index.dates.insert(pos, date_str)
+        return index
+
+    def range(self, start_str, end_str):
+        lo = bisect.bisect_left(self.dates, start_str)
+        hi = bisect.bisect_right(self.dates, end_str)
+        return self.dates[lo:hi]
+
+    def newest_first(self):
+        return self.dates[::-1]
+
+class SharedDiary:
+    """Parsed diary shared by every session in the process.
+
+    The dict is only reparsed when the store's version token changes, so
+    widget reruns cost a stat() instead of a full load. Its values are
+    read-only DayEntry records, validated as they load; days that fail
+    validation are left out and listed in `rejected` (the stored copy is
+    untouched). Treat the returned dict as read-only too: saves swap in an
+    updated copy (and date index) rather than mutating them under other
+    sessions.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.state = None  # (data, DateIndex, store version), replaced as a unit
+        self.rollups = RollupStore()
+        self.rejected = {}  # date -> why its stored entry failed validation
+
+    def _load(self, version):
+        data, self.rejected = load_records(self.store.load_all())
+        self.state = (data, DateIndex(data), version)
+        self.rollups = RollupStore(data)
+
+    def _is_current(self, version):
+        return self.state is not None and self.state[2] == version
+
+    def snapshot(self):
+        """(data, date index, version) as of the latest store version."""
+        if not self._is_current(self.store.version()):
+            with self.lock:
+                version = self.store.version()
+                if not self._is_current(version):
+                    self._load(version)
+        return self.state
+
+    def get_rollups(self):
+        self.snapshot()
+        return self.rollups
+
+    def get(self):
+        return self.snapshot()[0]
+
+    def index(self):
+        return self.snapshot()[1]
+
+    def range(self, start_str, end_str):
+        """Entries between two dates inclusive, in date order."""
+        data, index, _ = self.snapshot()
+        return {d: data[d] for d in index.range(start_str, end_str)}
+
+    def dates(self):
+        return self.index().dates
+
+    def iter_entries(self, start_str=None, end_str=None):
+        """(date, DayEntry) pairs in date order, optionally between two dates inclusive.
+
+        A store with its own iter_entries() (SQLite) is streamed from a
+        cursor and validated a day at a time, so exports never hold the
+        range in memory; days that fail validation are skipped, as in the
+        snapshot. The JSON diary is resident already, so it is walked from
+        the shared records.
+        """
+        if hasattr(self.store, "iter_entries"):
+            for date_str, raw in self.store.iter_entries(start_str, end_str):
+                try:
+                    yield date_str, DayEntry.from_dict(raw, date_str)
+                except RecordError:
+                    continue
+            return
+        data, index, _ = self.snapshot()
+        dates = index.dates if start_str is None and end_str is None else index.range(start_str or "", end_str or "9999-12-31")
+        for date_str in dates:
+            yield date_str, data[date_str]
+
+    def page(self, offset=0, limit=HISTORY_PAGE_SIZE, sort="date", descending=True,
+             gym_day=None, goal_met=None, weight_range=None):
+        """(matching day count, [(date, DayEntry)]) for one page of the history.
+
+        Filters: gym_day and goal_met (True/False, None for either) and
+        weight_range, a (min, max) pair where None leaves that end open; days
+        with no weight logged never match a weight range. Sorting is on one
+        of HISTORY_SORT_FIELDS, with unset values last. A store with its own
+        page() (SQLite) runs the query itself and only the page is read and
+        validated; the JSON store is already resident, so the page is cut
+        from the shared records. Either way, days that failed validation
+        (`rejected`) are neither counted nor listed.
+        """
+        if sort not in HISTORY_SORT_FIELDS:
+            raise ValueError(f"Can't sort the history by {sort!r}")
+        if hasattr(self.store, "page"):
+            self.snapshot()  # brings `rejected` up to date with the store
+            total, rows = self.store.page(offset, limit, sort, descending, gym_day, goal_met, weight_range,
+                                          exclude=sorted(self.rejected))
+            records, _ = load_records(dict(rows))
+            return total, list(records.items())
+        data, index, _ = self.snapshot()
+        lo, hi = weight_range or (None, None)
+        targets = {gym: goal_thresholds(gym) for gym in (True, False)}
+        def keep(entry):
+            if gym_day is not None and entry.is_gym_day != gym_day:
+                return False
+            if lo is not None or hi is not None:
+                if entry.weight is None or (lo is not None and entry.weight < lo) or (hi is not None and entry.weight > hi):
+                    return False
+            if goal_met is None:
+                return True
+            t = targets[entry.is_gym_day]
+            met = entry.total_calories >= t["calories"] and entry.total_protein >= t["protein"] and entry.steps >= t["steps"]
+            return met == goal_met
+        dates = index.newest_first() if descending else index.dates
+        matches = [(d, data[d]) for d in dates if keep(data[d])]
+        if sort != "date":
+            # The date order above breaks ties; unset values go last either way
+            unset = [m for m in matches if getattr(m[1], sort) is None]
+            matches = sorted((m for m in matches if getattr(m[1], sort) is not None),
+                             key=lambda m: getattr(m[1], sort), reverse=descending) + unset
+        return len(matches), matches[offset:offset + limit]
+
+    def save_entries(self, items, check_versions=True):
+        """Save (date, entry) pairs as one locked read-check-write; returns the saved DayEntry records.
+
+        With check_versions, each entry's VERSION_KEY must still match the
+        stored day, otherwise nothing is written and ConflictError lists the
+        stale dates. Versions are per day, so saves of different days never
+        conflict however close together they land. Each saved day's version
+        goes up by one.
+        """
+        items = list(items)
+        if not items:
+            return {}
+        with self.lock, self.store.locked():
+            if not self._is_current(self.store.version()):
+                # Someone else wrote since our last load; the check must see their days
+                self._load(self.store.version())
+            data, index, _ = self.state
+            if check_versions:
+                conflicts = {
+                    d: (entry_version(e), entry_version(data.get(d)))
+                    for d, e in items if entry_version(e) != entry_version(data.get(d))
+                }
+                if conflicts:
+                    raise ConflictError(conflicts)
+            # Validated before anything is written, dates included, so the rollup update below
+            # can't fail on saved data: a bad entry (RecordError) fails the whole batch
+            saved = [(d, DayEntry.from_dict({**e, VERSION_KEY: entry_version(data.get(d)) + 1}, d)) for d, e in items]
+            self.store.upsert_many([(d, record.to_dict()) for d, record in saved])
+            data = dict(data)
+            data.update(saved)
+            # One insert is cheaper than a re-sort; a batch of new days isn't
+            index = index.with_date(saved[0][0]) if len(saved) == 1 else DateIndex(data)
+            for date_str, _ in saved:
+                self.rollups.update_day(date_str, data, index)
+            self.state = (data, index, self.store.version())
+        return dict(saved)
+
+    def save_entry(self, date_str, entry, expected_version=None):
+        """Save one day; returns it with its new version.
+
+        expected_version is the version the caller's edit started from; if
+        the stored day has moved on since, ConflictError is raised instead of
+        overwriting it. None saves unconditionally (last write wins).
+        """
+        if expected_version is not None:
+            entry = {**entry, VERSION_KEY: expected_version}
+        return self.save_entries([(date_str, entry)], check_versions=expected_version is not None)[date_str]
+
+    def invalidate(self):
+        with self.lock:
+            self.state = None
+            self.rollups = RollupStore()
+            self.rejected = {}
+
+def get_shared_diary(backend=None, user=None):
+    key = (backend or STORAGE_BACKEND, user)
+    diary = _diaries.get(key)
+    if diary is None:
+        store = get_store(*key)
+        with _partition_lock(key):
+            diary = _diaries.get(key)
+            if diary is None:
+                diary = _diaries[key] = SharedDiary(store)
+    return diary
+
+@profiled("storage.load_data")
+def load_data(user=None):
+    return get_store(user=user).load_all()
+
+@profiled("storage.save_data")
+def save_data(data, user=None):
+    """Write back a whole diary dict, merged day by day with what is stored.
+
+    Days that changed are saved if their version still matches the store;
+    if any day was saved elsewhere meanwhile, nothing is written and
+    ConflictError names those days. Days missing from `data` are kept, so a
+    stale dict can no longer wipe out another session's saves.
+    """
+    diary = get_shared_diary(user=user)
+    current = diary.get()
+    # Raw dicts from load_data() are normalized first, so only real edits count as changes
+    changed = [(d, e) for d, e in sorted(data.items()) if DayEntry.from_dict(e, d) != current.get(d)]
+    return diary.save_entries(changed)
+
+@profiled("storage.save_entry")
+def save_entry(date_str, entry, user=None, expected_version=None):
+    return get_shared_diary(user=user).save_entry(date_str, entry, expected_version)
@@ -0,0 +1,181 @@
+"""Vectorized weight trend, maintenance-calorie (TDEE) estimate and goal projection.
+
+Works on the whole diary at once. history_arrays() lays weight, calorie
+intake and calories burned out on one contiguous daily axis (NaN where a
+day has nothing logged), and everything after that is array arithmetic,
+so decades of history take milliseconds. Results depend only on the
+diary, so callers cache them per data version.
+
+- Trend weight is an exponential moving average of the weigh-ins; days
+  without one carry the trend forward.
+- The TDEE estimate for a day comes from the TDEE_WINDOW_DAYS before it.
+  A least-squares slope of the trend says how fast weight moved, and
+  KCAL_PER_KG turns that into the calorie surplus or deficit behind the
+  average logged intake.
+"""
+
+from operator import attrgetter
+
+import numpy as np
+
+from .perf import profiled
+
+TREND_SMOOTHING = 0.1  # share of each weigh-in that moves the trend (about a 10-day memory)
+TDEE_WINDOW_DAYS = 28  # days of trend and intake behind each TDEE estimate
+TDEE_MIN_LOGGED_DAYS = 14  # windows with fewer days of logged food get no estimate
+KCAL_PER_KG = 7700  # energy in a kilogram of body-weight change
+PROJECTION_MAX_DAYS = 3650  # further out than this, a projected goal date is noise
+_ARRAY_FIELDS = ("weight", "total_calories", "total_calories_burned")
+_EMA_BLOCK = 256  # days per block in trend_weight; keeps the running products far from underflow
+
+def history_arrays(data, dates=None):
+    """{"days", "weight", "intake", "burned"} arrays, one slot per calendar day from first to last entry.
+
+    Days with no entry, no weigh-in or no food logged (total_calories of
+    0) are NaN. dates defaults to every day in data and must be sorted.
+    """
+    if dates is None:
+        dates = sorted(data)
+    if not len(dates):
+        empty = np.empty(0)
+        return {"days": np.empty(0, dtype="datetime64[D]"), "weight": empty, "intake": empty, "burned": empty}
+    entries = list(map(data.__getitem__, dates))
+    days = np.array(dates, dtype="datetime64[D]")
+    slots = (days - days[0]).astype(np.int64)
+    span = int(slots[-1]) + 1
+    try:
+        # One C-level slot read per DayEntry; plain entry dicts take the slower path
+        rows = list(map(attrgetter(*_ARRAY_FIELDS), entries))
+    except AttributeError:
+        rows = [tuple(e.get(key) for key in _ARRAY_FIELDS) for e in entries]
+    columns = np.full((span, len(_ARRAY_FIELDS)), np.nan)
+    columns[slots] = np.array(rows, dtype=float)  # None -> NaN
+    weight, intake, burned = np.ascontiguousarray(columns.T)
+    intake[intake <= 0] = np.nan
+    return {"days": days[0] + np.arange(span), "weight": weight, "intake": intake, "burned": burned}
+
+def trend_weight(weight, smoothing=TREND_SMOOTHING):
+    """Exponential moving average of weight, NaN before the first weigh-in.
+
+    The recurrence trend[i] = trend[i-1] + a[i] * (weight[i] - trend[i-1])
+    (a[i] is 0 on days without a weigh-in) is solved in closed form with
+    cumulative products and sums. Blocks of _EMA_BLOCK days restart the
+    products, so they never underflow, and only the hand-off between
+    blocks is a Python loop.
+    """
+    if not 0 < smoothing < 1:
+        raise ValueError("smoothing must be between 0 and 1")
+    weight = np.asarray(weight, dtype=float)
+    trend = np.full(len(weight), np.nan)
+    observed = ~np.isnan(weight)
+    if not observed.any():
+        return trend
+    first = int(observed.argmax())
+    w = weight[first:]
+    n = len(w)
+    blocks = -(-n // _EMA_BLOCK)
+    pad = blocks * _EMA_BLOCK - n
+    rate = np.where(np.isnan(w), 0.0, smoothing)
+    rate[0] = 0.0  # the first weigh-in seeds the trend instead of moving it
+    rate = np.pad(rate, (0, pad)).reshape(blocks, _EMA_BLOCK)
+    values = np.pad(np.nan_to_num(w), (0, pad)).reshape(blocks, _EMA_BLOCK)
+    keep = np.cumprod(1.0 - rate, axis=1)  # how much of the block's starting trend survives to each day
+    local = np.cumsum(rate * values / keep, axis=1) * keep  # the block's trend had it started at 0
+    start = np.empty(blocks)
+    carry = w[0]
+    for b in range(blocks):
+        start[b] = carry
+        carry = keep[b, -1] * carry + local[b, -1]
+    trend[first:] = (local + keep * start[:, None]).ravel()[:n]
+    return trend
+
+def _window_sums(values, window):
+    """Sum of each `window`-day run ending on each day; NaN for the first window - 1 days."""
+    sums = np.full(len(values), np.nan)
+    if len(values) >= window:
+        totals = np.concatenate(([0.0], np.cumsum(values)))
+        sums[window - 1:] = totals[window:] - totals[:-window]
+    return sums
+
+def rolling_tdee(trend, intake, burned, window=TDEE_WINDOW_DAYS, min_logged=TDEE_MIN_LOGGED_DAYS):
+    """{"slope", "tdee", "baseline"} arrays from the window of days ending on each day.
+
+    slope is the trend's least-squares change in kg/day. tdee is the average
+    logged intake minus the energy that change accounts for. baseline is
+    the same for net calories, i.e. maintenance before the steps and
+    workouts the diary already counts. Each is NaN where the window starts
+    before the first weigh-in or has fewer than min_logged days of food.
+    """
+    trend = np.asarray(trend, dtype=float)
+    n = len(trend)
+    slope = np.full(n, np.nan)
+    if n >= window:
+        # The least-squares slope over a full window is a fixed weighting of its days
+        offsets = np.arange(window) - (window - 1) / 2
+        slope[window - 1:] = np.convolve(trend, (offsets / (offsets @ offsets))[::-1], "valid")
+    logged = ~np.isnan(intake)
+    days_logged = _window_sums(logged.astype(float), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_intake = _window_sums(np.where(logged, intake, 0.0), window) / days_logged
+        mean_burned = _window_sums(np.where(logged, np.nan_to_num(burned), 0.0), window) / days_logged
+        stored_energy = slope * KCAL_PER_KG
+        enough = days_logged >= min_logged
+        return {
+            "slope": slope,
+            "tdee": np.where(enough, mean_intake - stored_energy, np.nan),
+            "baseline": np.where(enough, mean_intake - mean_burned - stored_energy, np.nan),
+        }
+
+def project_target_date(days, trend, slope, target_kg):
+    """The day the trend reaches target_kg at its latest rate, or None.
+
+    None if there is no trend yet, the trend is moving away from the target
+    (or not moving), or the date is more than PROJECTION_MAX_DAYS away.
+    """
+    known = np.flatnonzero(~np.isnan(trend) & ~np.isnan(slope))
+    if not len(known):
+        return None
+    i = known[-1]
+    gap = target_kg - trend[i]
+    if abs(gap) < 0.05:
+        return days[i].astype(object)
+    if slope[i] == 0 or gap / slope[i] < 0 or gap / slope[i] > PROJECTION_MAX_DAYS:
+        return None
+    return (days[i] + np.timedelta64(int(np.ceil(gap / slope[i])), "D")).astype(object)
+
+def _latest(values):
+    known = values[~np.isnan(values)]
+    return float(known[-1]) if len(known) else None
+
+class WeightTrends:
+    """Trend weight and TDEE series for a diary, all on one daily axis."""
+
+    def __init__(self, data, dates=None, smoothing=TREND_SMOOTHING, window=TDEE_WINDOW_DAYS):
+        arrays = history_arrays(data, dates)
+        self.days = arrays["days"]
+        self.weight = arrays["weight"]
+        self.intake = arrays["intake"]
+        self.burned = arrays["burned"]
+        self.trend = trend_weight(self.weight, smoothing)
+        estimates = rolling_tdee(self.trend, self.intake, self.burned, window)
+        self.slope = estimates["slope"]
+        self.tdee = estimates["tdee"]
+        self.baseline = estimates["baseline"]
+
+    def current(self):
+        """Latest known trend weight, weekly rate (kg), TDEE and baseline; None where unknown."""
+        rate = _latest(self.slope)
+        return {
+            "trend_weight": _latest(self.trend),
+            "weekly_rate": None if rate is None else rate * 7,
+            "tdee": _latest(self.tdee),
+            "baseline": _latest(self.baseline),
+        }
+
+    def projected_date(self, target_kg):
+        return project_target_date(self.days, self.trend, self.slope, target_kg)
+
+@profiled("compute.weight_trends")
+def analyze_trends(data, dates=None):
+    """WeightTrends for a whole diary (or the given sorted dates)."""
+    return WeightTrends(data, dates)